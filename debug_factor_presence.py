@@ -17,38 +17,41 @@ def env_required(name: str) -> str:
 def main():
     sb = create_client(env_required("SUPABASE_URL"), env_required("SUPABASE_KEY"))
 
-    # 1) factor_code 전체 목록/개수
-    r = sb.table("factor_returns").select("factor_code,record_date,ret").execute()
+    # 1) factor_code 전체 목록/개수 (factor_counts RPC로 서버 집계, rpc_factor_returns.sql)
+    r = sb.rpc("factor_counts").execute()
     df = pd.DataFrame(r.data or [])
-    print("rows:", len(df))
     if df.empty:
+        print("rows:", 0)
         print("factor_returns is empty")
         return
 
-    df["record_date"] = pd.to_datetime(df["record_date"], errors="coerce").dt.date
-    df["ret"] = pd.to_numeric(df["ret"], errors="coerce")
+    df["n"] = pd.to_numeric(df["n"], errors="coerce").fillna(0).astype(int)
+    df["null_rets"] = pd.to_numeric(df["null_rets"], errors="coerce").fillna(0).astype(int)
+    df = df.sort_values("n", ascending=False)
+    print("rows:", int(df["n"].sum()))
 
     print("\n[distinct factor_code]")
-    print(df["factor_code"].value_counts().head(30).to_string())
+    print(df.set_index("factor_code")["n"].head(30).to_string())
 
     # 2) F_RATE_US10Y 존재 여부/기간/NULL 체크
     target = "F_RATE_US10Y"
-    dft = df[df["factor_code"] == target].copy()
+    dft = df[df["factor_code"] == target]
 
-    print(f"\n[{target}] count:", len(dft))
+    print(f"\n[{target}] count:", int(dft["n"].sum()))
     if not dft.empty:
-        print("min_date:", dft["record_date"].min(), "max_date:", dft["record_date"].max())
+        row = dft.iloc[0]
+        print("min_date:", row["min_date"], "max_date:", row["max_date"])
         meta = sb.table("factor_metadata").select("frequency").eq("factor_code", target).limit(1).execute()
         freq = None
         if meta.data:
             freq = meta.data[0].get("frequency")
         print("frequency (metadata):", freq)
-        print("ret null count:", int(dft["ret"].isna().sum()))
+        print("ret null count:", int(row["null_rets"]))
 
         # 3) 혹시 공백/대소문자 꼬임 찾기 (LIKE 대체)
-        df_like = df[df["factor_code"].astype(str).str.contains("US10Y", na=False)]
+        df_like = df[df["factor_code"].str.contains("US10Y", regex=False, na=False)]
         print("\n[factor_code contains 'US10Y']")
-        print(df_like["factor_code"].value_counts().to_string())
+        print(df_like.set_index("factor_code")["n"].to_string())
 
 if __name__ == "__main__":
     main()
@@ -30,19 +30,31 @@ from __future__ import annotations
 
 import os
 import math
-import time
 import datetime as dt
 import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import requests
-import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
-from pykrx import stock
 from supabase import create_client, Client
 
+try:
+    import orjson
+except Exception:  # optional dependency
+    orjson = None
+
+try:
+    from requests_cache import CachedSession
+except Exception:  # optional dependency
+    CachedSession = None
+
 # ----------------------------
 # .env load
 # ----------------------------
@@ -52,12 +64,21 @@ load_dotenv(override=False)
 # Config
 # ----------------------------
 FACTOR_TABLE = "factor_returns"
-UPSERT_CHUNK_SIZE = 500
+BULK_UPSERT_RPC = "factor_returns_bulk_upsert"
+LAST_DATES_RPC = "factor_last_dates"
+UPSERT_CHUNK_SIZE = 10000  # 업서트 1회당 row 수 (RPC/폴백 공통)
 HTTP_TIMEOUT = 30
+HTTP_CACHE_NAME = "factor_http_cache"  # requests-cache 설치 시 SQLite 캐시 파일명(.sqlite)
+HTTP_CACHE_EXPIRE_SEC = 86400  # 같은 (series, start, end) 요청은 하루 동안 디스크에서 재사용
+FETCH_MAX_WORKERS = 8
+UPSERT_MAX_WORKERS = 2
+ECOS_PAGE_SIZE = 1000
+ECOS_MAX_WORKERS = 4  # ECOS 동시 요청 상한
 KST_TZ = "Asia/Seoul"
 
 # lookback (safety buffer)
 LOOKBACK_DAYS_DAILY = 14
+LOOKBACK_DAYS_DAILY_INCREMENTAL = 7  # last_date가 asof 직전일 때 (주말/연휴 커버)
 LOOKBACK_MONTHS_MONTHLY = 2
 DURATION_US10Y = 8.5
 DURATION_KR10Y = 8.5
@@ -78,8 +99,49 @@ LAG_POLICY_BY_FACTOR = {
     "F_SECTOR_US_UTILITIES": "1",
 }
 
+# date-only 관측치가 대부분이라 tz 의미는 약함. 디버깅용 라벨만 남김.
+SOURCE_TZ_LABELS = {
+    "FRED": "date-only",
+    "ECOS": "date-only",
+    "NASDAQ_DATALINK": "date-only",
+    "PYKRX": "date-only",
+    "YFINANCE": "yfinance-index",
+}
+
+_YF_LOCK = threading.Lock()
+
+
+def _build_http_session(use_cache: bool = True) -> requests.Session:
+    # FRED/ECOS/Nasdaq 호출 공용 keep-alive 세션 (팩터 병렬 fetch 워커들이 공유)
+    if use_cache and CachedSession is not None:
+        # URL/params(series_id, start, end)가 같은 응답만 재사용. end(asof)가 바뀌는 다음 날엔 새로 조회됨
+        # api_key는 캐시 키/저장된 요청 URL에서 제외 (SQLite 파일에 키가 평문으로 남지 않게)
+        session = CachedSession(
+            HTTP_CACHE_NAME,
+            expire_after=HTTP_CACHE_EXPIRE_SEC,
+            allowable_codes=(200,),
+            ignored_parameters=["api_key"],
+        )
+    else:
+        session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+_HTTP_SESSION = _build_http_session()
+# ECOS는 API 키가 URL 경로에 들어가 ignored_parameters로 가릴 수 없음 -> 캐시 없는 세션
+_ECOS_SESSION = _build_http_session(use_cache=False)
 
-@dataclass(frozen=True)
+
+def disable_http_cache() -> None:
+    # --full-refresh: 같은 날 캐시된 응답 대신 항상 원본을 다시 조회
+    global _HTTP_SESSION
+    _HTTP_SESSION = _build_http_session(use_cache=False)
+
+
+@dataclass(frozen=True, slots=True)
 class FactorSpec:
     factor_code: str
     factor_name: str
@@ -132,15 +194,37 @@ def apply_lookback(start: dt.date, frequency: str) -> dt.date:
 # Helpers: normalize datetime index to "source-original" naive datetime
 # ----------------------------
 def _to_naive_datetime_index(idx: pd.Index) -> pd.DatetimeIndex:
-    di = pd.to_datetime(idx)
+    # yfinance/pykrx는 이미 DatetimeIndex -> 재변환(복사) 생략
+    di = idx if isinstance(idx, pd.DatetimeIndex) else pd.DatetimeIndex(pd.to_datetime(idx))
     # tz-aware이면 tz 정보만 제거(벽시각 유지) => "원본에 가장 가까운" 형태
-    try:
-        if getattr(di, "tz", None) is not None:
-            di = di.tz_localize(None)
-    except Exception:
-        # 일부 케이스 방어
-        pass
-    return pd.DatetimeIndex(di)
+    if di.tz is not None:
+        di = di.tz_localize(None)
+    return di
+
+
+def _sort_index_if_needed(obj):
+    # 소스 응답은 대부분 이미 날짜 오름차순 -> 정렬(O(n log n) + 복사) 생략
+    if obj.index.is_monotonic_increasing:
+        return obj
+    return obj.sort_index()
+
+
+def _series_from_arrays(dates: pd.DatetimeIndex, vals: List[float]) -> pd.Series:
+    """
+    (날짜, 값) 병렬 배열 -> 날짜 오름차순 Series.
+    날짜 문자열은 tz 없이 일괄 파싱되므로 이미 naive.
+    파싱 실패(NaT)는 제외하고, 중복 날짜는 마지막 값 유지.
+    """
+    s = pd.Series(np.asarray(vals, dtype=np.float64), index=pd.DatetimeIndex(dates))
+    s = s[s.index.notna() & ~s.index.duplicated(keep="last")]
+    return _sort_index_if_needed(s)
+
+
+def _response_json(r: requests.Response):
+    # orjson이 있으면 바이트에서 바로 디코드(표준 json보다 빠름), 결과 dict 형태는 동일
+    if orjson is not None:
+        return orjson.loads(r.content)
+    return r.json()
 
 
 # ----------------------------
@@ -155,25 +239,33 @@ def fred_fetch_series(fred_api_key: str, series_id: str, start: dt.date, end: dt
         "observation_start": start.isoformat(),
         "observation_end": end.isoformat(),
     }
-    r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
+    r = _HTTP_SESSION.get(url, params=params, timeout=HTTP_TIMEOUT)
     r.raise_for_status()
-    data = r.json()
+    data = _response_json(r)
     obs = data.get("observations", [])
 
-    rows: List[Tuple[pd.Timestamp, float]] = []
+    date_strs: List[str] = []
+    vals: List[float] = []
     for o in obs:
         d = o.get("date")
         v = o.get("value")
-        if v is None or v == ".":
+        if d is None or v is None or v == ".":
             continue
         try:
-            rows.append((pd.to_datetime(d), float(v)))
+            fv = float(v)
         except ValueError:
             continue
+        date_strs.append(d)
+        vals.append(fv)
+
+    dates = pd.to_datetime(date_strs, format="%Y-%m-%d", errors="coerce", cache=True)
+    return _series_from_arrays(dates, vals)
 
-    s = pd.Series({d: v for d, v in rows}).sort_index()
-    s.index = _to_naive_datetime_index(s.index)
-    return s
+
+def _ecos_fetch_page(url: str) -> Dict:
+    r = _ECOS_SESSION.get(url, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    return _response_json(r).get("StatisticSearch") or {}
 
 
 def ecos_fetch_series(
@@ -196,48 +288,38 @@ def ecos_fetch_series(
     else:
         raise ValueError(f"Unsupported ECOS cycle: {cycle}")
 
-    all_rows: List[Tuple[pd.Timestamp, float]] = []
-    start_no = 1
-    page_size = 1000
-
-    while True:
-        end_no = start_no + page_size - 1
-        url = f"{base}/{start_no}/{end_no}/{stat_code}/{cycle}/{s_start}/{s_end}/{item_code}"
-        r = requests.get(url, timeout=HTTP_TIMEOUT)
-        r.raise_for_status()
-        payload = r.json()
-
-        root = payload.get("StatisticSearch")
-        if not root:
-            break
-
-        rows = root.get("row", [])
-        if not rows:
-            break
-
+    def page_url(start_no: int) -> str:
+        end_no = start_no + ECOS_PAGE_SIZE - 1
+        return f"{base}/{start_no}/{end_no}/{stat_code}/{cycle}/{s_start}/{s_end}/{item_code}"
+
+    # 첫 페이지로 전체 건수(list_total_count)를 확인한 뒤 나머지 페이지는 병렬 조회
+    first = _ecos_fetch_page(page_url(1))
+    pages: List[List[Dict]] = [first.get("row") or []]
+    total = int(first.get("list_total_count") or 0)
+    rest_urls = [page_url(no) for no in range(1 + ECOS_PAGE_SIZE, total + 1, ECOS_PAGE_SIZE)]
+    if pages[0] and rest_urls:
+        with ThreadPoolExecutor(max_workers=min(ECOS_MAX_WORKERS, len(rest_urls))) as executor:
+            for root in executor.map(_ecos_fetch_page, rest_urls):
+                pages.append(root.get("row") or [])
+
+    time_strs: List[str] = []
+    vals: List[float] = []
+    for rows in pages:
         for row in rows:
             t = row.get("TIME")
             v = row.get("DATA_VALUE")
             if t is None or v is None or v == "":
                 continue
             try:
-                if cycle == "D":
-                    ts = pd.to_datetime(t, format="%Y%m%d")
-                else:
-                    ts = pd.to_datetime(t, format="%Y%m")
-                all_rows.append((ts, float(v)))
+                fv = float(v)
             except ValueError:
                 continue
+            time_strs.append(t)
+            vals.append(fv)
 
-        if len(rows) < page_size:
-            break
-
-        start_no += page_size
-        time.sleep(0.12)
-
-    s = pd.Series({d: v for d, v in all_rows}).sort_index()
-    s.index = _to_naive_datetime_index(s.index)
-    return s
+    fmt = "%Y%m%d" if cycle == "D" else "%Y%m"
+    dates = pd.to_datetime(time_strs, format=fmt, errors="coerce", cache=True)
+    return _series_from_arrays(dates, vals)
 
 
 def nasdaq_datalink_fetch_series(api_key: str, dataset_code: str, start: dt.date, end: dt.date) -> pd.Series:
@@ -248,9 +330,9 @@ def nasdaq_datalink_fetch_series(api_key: str, dataset_code: str, start: dt.date
         "end_date": end.isoformat(),
         "order": "asc",
     }
-    r = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
+    r = _HTTP_SESSION.get(url, params=params, timeout=HTTP_TIMEOUT)
     r.raise_for_status()
-    js = r.json()
+    js = _response_json(r)
     ds = js.get("dataset", {})
     data = ds.get("data", [])
     cols = ds.get("column_names", [])
@@ -264,17 +346,18 @@ def nasdaq_datalink_fetch_series(api_key: str, dataset_code: str, start: dt.date
     if price_idx is None:
         price_idx = 1 if len(cols) > 1 else None
 
-    rows: List[Tuple[pd.Timestamp, float]] = []
+    date_strs: List[str] = []
+    vals: List[float] = []
     for row in data:
         d = row[0]
         v = row[price_idx] if price_idx is not None else None
         if v is None:
             continue
-        rows.append((pd.to_datetime(d), float(v)))
+        date_strs.append(d)
+        vals.append(float(v))
 
-    s = pd.Series({d: v for d, v in rows}).sort_index()
-    s.index = _to_naive_datetime_index(s.index)
-    return s
+    dates = pd.to_datetime(date_strs, format="%Y-%m-%d", errors="coerce", cache=True)
+    return _series_from_arrays(dates, vals)
 
 
 def _ensure_series_close(close_obj: Union[pd.Series, pd.DataFrame]) -> pd.Series:
@@ -296,18 +379,22 @@ def yfinance_fetch_close_series(
     - yfinance가 준 index를 그대로 naive datetime으로만 정규화(tz 제거)
     - KST 변환/UTC 가정 변환 없음
     """
+    import yfinance as yf  # 지연 import: yfinance 팩터가 없는 실행에선 로딩 비용 생략
+
     last_err = None
     for sym in symbols:
         try:
-            df = yf.download(
-                sym,
-                start=start.isoformat(),
-                end=(end_inclusive + dt.timedelta(days=1)).isoformat(),  # inclusive
-                interval="1d",
-                auto_adjust=False,
-                progress=False,
-                threads=True,
-            )
+            # yf.download는 모듈 전역 상태를 공유하므로 팩터 병렬 fetch 중에도 한 번에 하나만 호출
+            with _YF_LOCK:
+                df = yf.download(
+                    sym,
+                    start=start.isoformat(),
+                    end=(end_inclusive + dt.timedelta(days=1)).isoformat(),  # inclusive
+                    interval="1d",
+                    auto_adjust=False,
+                    progress=False,
+                    threads=False,
+                )
             if df is None or df.empty:
                 continue
             if "Close" not in df.columns:
@@ -319,7 +406,7 @@ def yfinance_fetch_close_series(
                 continue
 
             s.index = _to_naive_datetime_index(s.index)
-            s = s.sort_index()
+            s = _sort_index_if_needed(s)
             return sym, s
 
         except Exception as e:
@@ -329,11 +416,56 @@ def yfinance_fetch_close_series(
     raise RuntimeError(f"yfinance fetch failed for {symbols}. last_err={last_err}")
 
 
+def yfinance_download_close_map(
+    symbols: List[str],
+    start: dt.date,
+    end_inclusive: dt.date,
+) -> Dict[str, pd.Series]:
+    """
+    여러 심볼을 yf.download 한 번으로 받아 {symbol: close Series} 반환.
+    비었거나(상장 전/심볼 오류) 관측치가 2개 미만인 심볼은 빠짐 -> 호출 측에서 개별 폴백.
+    """
+    out: Dict[str, pd.Series] = {}
+    if not symbols:
+        return out
+
+    import yfinance as yf  # 지연 import
+
+    with _YF_LOCK:
+        df = yf.download(
+            symbols,
+            start=start.isoformat(),
+            end=(end_inclusive + dt.timedelta(days=1)).isoformat(),  # inclusive
+            interval="1d",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            group_by="ticker",
+        )
+    if df is None or df.empty:
+        return out
+
+    multi = isinstance(df.columns, pd.MultiIndex)
+    for sym in symbols:
+        try:
+            close_raw = df[sym]["Close"] if multi else df["Close"]
+        except KeyError:
+            continue
+        s = _ensure_series_close(close_raw).dropna()
+        if len(s) < 2:
+            continue
+        s.index = _to_naive_datetime_index(s.index)
+        out[sym] = _sort_index_if_needed(s)
+    return out
+
+
 def pykrx_fetch_close_series(
     ticker: str,
     start: dt.date,
     end_inclusive: dt.date,
 ) -> pd.Series:
+    from pykrx import stock  # 지연 import: PYKRX 팩터가 없는 실행에선 로딩 비용 생략
+
     ticker = ticker.replace("KRX:", "").lstrip("Q")
     start_str = start.strftime("%Y%m%d")
     end_str = end_inclusive.strftime("%Y%m%d")
@@ -350,27 +482,70 @@ def pykrx_fetch_close_series(
         raise RuntimeError(f"pykrx close series too short for {ticker}")
 
     s.index = _to_naive_datetime_index(s.index)
-    return s.sort_index().astype(float)
+    return _sort_index_if_needed(s).astype(float)
 
 
 # ----------------------------
 # Returns
 # ----------------------------
 def compute_returns(level: pd.Series, ret_type: str, duration_years: Optional[float] = None) -> pd.Series:
-    level = level.dropna().astype(float)
+    if ret_type not in ("log_return", "diff_pp", "duration_return"):
+        raise ValueError(f"Unsupported ret_type: {ret_type}")
+
+    # fetcher/main에서 이미 float64 + dropna 된 경우가 대부분 -> 불필요한 복사 생략
+    if level.dtype != np.float64:
+        level = level.astype(np.float64)
+    if level.hasnans:
+        level = level.dropna()
+    if ret_type == "log_return" and not (level > 0).all():
+        level = level[level > 0]
+
+    vals = level.to_numpy(dtype=np.float64)
+    out = np.empty_like(vals)
+    if len(vals) == 0:
+        return pd.Series(out, index=level.index)
+    out[0] = np.nan
 
     if ret_type == "log_return":
-        level = level[level > 0]
-        return (level.apply(math.log) - level.shift(1).apply(math.log))
-    if ret_type == "diff_pp":
-        return level - level.shift(1)
-    if ret_type == "duration_return":
+        logs = np.log(vals)
+        np.subtract(logs[1:], logs[:-1], out=out[1:])
+    elif ret_type == "diff_pp":
+        np.subtract(vals[1:], vals[:-1], out=out[1:])
+    else:
         if duration_years is None:
             duration_years = DURATION_US10Y
-        diff_pp = level - level.shift(1)
-        return -float(duration_years) * (diff_pp / 100.0)
+        np.subtract(vals[1:], vals[:-1], out=out[1:])
+        out[1:] *= -float(duration_years) / 100.0
+
+    return pd.Series(out, index=level.index)
+
+
+def _nullable_float_values(col: pd.Series) -> np.ndarray:
+    # NaN -> None (JSON null), 나머지는 파이썬 float
+    return col.astype(object).where(col.notna(), None).to_numpy()
 
-    raise ValueError(f"Unsupported ret_type: {ret_type}")
+
+def build_factor_rows(factor_code: str, df: pd.DataFrame) -> List[Dict]:
+    """
+    level/ret DataFrame(index=원본 날짜)을 factor_returns 업서트 row 목록으로 변환.
+    """
+    # ✅ 원본 index의 date 그대로 (datetime64 -> "YYYY-MM-DD" 일괄 변환)
+    iso_dates = np.datetime_as_string(df.index.values, unit="D").tolist()
+    levels = _nullable_float_values(df["level"]).tolist()
+    rets = _nullable_float_values(df["ret"]).tolist()
+    return [
+        {
+            "factor_code": factor_code,
+            "record_date": d,            # 기존 컬럼(= 원본 날짜로 사용)
+            "level": lv,
+            "ret": rv,
+
+            # ✅ 새 컬럼(있다면 같이 저장; 없으면 Supabase가 에러 낼 수 있음)
+            "observed_date": d,
+            "effective_kr_date": None,
+        }
+        for d, lv, rv in zip(iso_dates, levels, rets)
+    ]
 
 
 # ----------------------------
@@ -428,14 +603,83 @@ def supabase_get_last_date(sb: Client, factor_code: str) -> Optional[dt.date]:
     return dt.date.fromisoformat(data[0]["record_date"])
 
 
+def supabase_get_last_dates(sb: Client, factor_codes: List[str]) -> Dict[str, dt.date]:
+    """
+    factor_last_dates RPC(rpc_factor_returns.sql)로 팩터별 마지막 날짜를 한 번에 조회.
+    RPC가 아직 없으면 팩터별 조회로 폴백.
+    """
+    if not factor_codes:
+        return {}
+    try:
+        resp = sb.rpc(LAST_DATES_RPC, {"factor_codes": factor_codes}).execute()
+        return {
+            row["factor_code"]: dt.date.fromisoformat(row["last_date"])
+            for row in (resp.data or [])
+            if row.get("last_date")
+        }
+    except Exception as e:
+        print(f"[WARN] {LAST_DATES_RPC} rpc failed, fallback to per-factor query: {e}")
+
+    last_dates: Dict[str, dt.date] = {}
+    for code in factor_codes:
+        last_date = supabase_get_last_date(sb, code)
+        if last_date is not None:
+            last_dates[code] = last_date
+    return last_dates
+
+
+def _same_value(a, b) -> bool:
+    # 저장값과 전체 정밀도로 비교 (반올림하면 저변동 팩터의 미세한 수정이 "변경 없음"으로 묻힘)
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(float(a), float(b), rel_tol=1e-12, abs_tol=0.0)
+
+
+def _factor_row_unchanged(row: Dict, existing: Dict[str, Tuple[Optional[float], Optional[float]]]) -> bool:
+    prev = existing.get(str(row["record_date"]))
+    if prev is None:
+        return False
+    return _same_value(row.get("level"), prev[0]) and _same_value(row.get("ret"), prev[1])
+
+
+def supabase_fetch_existing_rows(
+    sb: Client,
+    factor_code: str,
+    start: dt.date,
+) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """
+    start 이후 이미 저장된 {record_date: (level, ret)}.
+    증분 백필 구간(수일~수주)만 조회하므로 PostgREST 기본 limit 안에 들어온다.
+    """
+    resp = (
+        sb.table(FACTOR_TABLE)
+        .select("record_date,level,ret")
+        .eq("factor_code", factor_code)
+        .gte("record_date", start.isoformat())
+        .execute()
+    )
+    return {str(r["record_date"]): (r.get("level"), r.get("ret")) for r in (resp.data or [])}
+
+
 def supabase_upsert_rows(sb: Client, rows: List[Dict]) -> None:
+    """
+    factor_returns_bulk_upsert RPC(rpc_factor_returns.sql)로 UPSERT_CHUNK_SIZE 단위 업서트.
+    RPC가 아직 없으면 table upsert로 폴백.
+    """
+    use_rpc = True
     for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
         chunk = rows[i : i + UPSERT_CHUNK_SIZE]
+        if use_rpc:
+            try:
+                sb.rpc(BULK_UPSERT_RPC, {"payload": chunk}).execute()
+                continue
+            except Exception as e:
+                print(f"[WARN] {BULK_UPSERT_RPC} rpc failed, fallback to table upsert: {e}")
+                use_rpc = False
         sb.table(FACTOR_TABLE).upsert(chunk, on_conflict="factor_code,record_date").execute()
 
 
-def supabase_upsert_factor_metadata(
-    sb: Client,
+def build_factor_metadata_row(
     spec: FactorSpec,
     source: str,
     source_series: str,
@@ -443,25 +687,35 @@ def supabase_upsert_factor_metadata(
     ret_type: str,
     lag_policy: Optional[str],
     existing: Dict[str, Optional[str]],
-) -> None:
+) -> Optional[Dict[str, Optional[str]]]:
+    """
+    factor_metadata에서 비어 있는 컬럼만 채우는 row. 채울 게 없으면 None.
+    """
+    candidates = (
+        ("factor_name", spec.factor_name),
+        ("source", source),
+        ("source_series", source_series),
+        ("frequency", frequency),
+        ("ret_type", ret_type),
+        ("lag_policy", lag_policy),
+        ("source_tz", source_tz_label(source)),
+    )
     row: Dict[str, Optional[str]] = {"factor_code": spec.factor_code}
-    if not _meta_value(existing.get("factor_name")):
-        row["factor_name"] = spec.factor_name
-    if not _meta_value(existing.get("source")):
-        row["source"] = source
-    if not _meta_value(existing.get("source_series")):
-        row["source_series"] = source_series
-    if not _meta_value(existing.get("frequency")):
-        row["frequency"] = frequency
-    if not _meta_value(existing.get("ret_type")):
-        row["ret_type"] = ret_type
-    if not _meta_value(existing.get("lag_policy")) and lag_policy is not None:
-        row["lag_policy"] = lag_policy
-    if not _meta_value(existing.get("source_tz")):
-        row["source_tz"] = source_tz_label(source)
+    for col, value in candidates:
+        if value is not None and not _meta_value(existing.get(col)):
+            row[col] = value
     if len(row) == 1:
-        return
-    sb.table("factor_metadata").upsert(row).execute()
+        return None
+    return row
+
+
+def supabase_upsert_factor_metadata(sb: Client, rows: List[Dict[str, Optional[str]]]) -> None:
+    # 컬럼 구성이 다른 row를 한 요청에 섞으면 빠진 컬럼이 NULL로 덮이므로 컬럼 조합별로 묶어서 업서트
+    groups: Dict[Tuple[str, ...], List[Dict[str, Optional[str]]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for group in groups.values():
+        sb.table("factor_metadata").upsert(group, on_conflict="factor_code").execute()
 
 
 def supabase_delete_factor_returns(sb: Client, factor_codes: List[str]) -> None:
@@ -710,12 +964,7 @@ def build_factor_specs(nasdaq_enabled: bool) -> List[FactorSpec]:
 
 
 def source_tz_label(source: str) -> str:
-    # date-only 관측치가 대부분이라 tz 의미는 약함. 디버깅용 라벨만 남김.
-    if source in ("FRED", "ECOS", "NASDAQ_DATALINK", "PYKRX"):
-        return "date-only"
-    if source == "YFINANCE":
-        return "yfinance-index"
-    return "unknown"
+    return SOURCE_TZ_LABELS.get(source, "unknown")
 
 
 def parse_args() -> argparse.Namespace:
@@ -737,6 +986,72 @@ def parse_args() -> argparse.Namespace:
 # ----------------------------
 # Main
 # ----------------------------
+@dataclass(frozen=True, slots=True)
+class FactorJob:
+    spec: FactorSpec
+    meta: Dict[str, Optional[str]]
+    source: str
+    source_series: str
+    frequency: str
+    ret_type: str
+    lag_policy: Optional[str]
+    start_store: dt.date
+    start_fetch: dt.date
+    last_date: Optional[dt.date]
+
+
+def fetch_level(
+    job: FactorJob,
+    end: dt.date,
+    fred_key: str,
+    ecos_key: str,
+    nasdaq_key: str,
+    yf_close_map: Optional[Dict[str, pd.Series]] = None,
+) -> Tuple[str, pd.Series]:
+    """
+    job 하나의 "level" 시계열을 가져온다. (used_source_series, level) 반환.
+    ThreadPoolExecutor 워커에서 호출되므로 Supabase/print 부작용 없이 fetch만 수행.
+    yf_close_map: yfinance_download_close_map 일괄 결과(1순위 후보 심볼 기준), 없으면 개별 조회.
+    """
+    spec = job.spec
+    source = job.source
+    source_series = job.source_series
+    start_fetch = job.start_fetch
+
+    if source == "FRED":
+        return source_series, fred_fetch_series(fred_key, source_series, start_fetch, end)
+
+    if source == "ECOS":
+        assert spec.ecos_stat_code and spec.ecos_cycle and spec.ecos_item_code
+        level = ecos_fetch_series(
+            ecos_api_key=ecos_key,
+            stat_code=spec.ecos_stat_code,
+            cycle=spec.ecos_cycle,
+            item_code=spec.ecos_item_code,
+            start=start_fetch,
+            end=end,
+        )
+        return source_series, level
+
+    if source == "NASDAQ_DATALINK":
+        return source_series, nasdaq_datalink_fetch_series(nasdaq_key, source_series, start_fetch, end)
+
+    if source == "PYKRX":
+        return source_series, pykrx_fetch_close_series(source_series, start_fetch, end)
+
+    if source == "YFINANCE":
+        cands = spec.yf_candidates or [source_series]
+        if yf_close_map:
+            s = yf_close_map.get(cands[0])
+            if s is not None:
+                s = s.loc[pd.Timestamp(start_fetch):]
+                if len(s) >= 2:
+                    return cands[0], s
+        return yfinance_fetch_close_series(cands, start_fetch, end)
+
+    raise ValueError(f"Unknown source: {source}")
+
+
 def main():
     args = parse_args()
     target_factor_codes = [
@@ -771,12 +1086,16 @@ def main():
     meta_map = fetch_factor_metadata_map(sb, factor_codes)
 
     if args.full_refresh and target_factor_codes:
+        disable_http_cache()
         supabase_delete_factor_returns(sb, target_factor_codes)
         print(f"[INFO] deleted factor_returns for {len(target_factor_codes)} factor(s)")
 
-    total_rows = 0
+    last_date_map = supabase_get_last_dates(sb, factor_codes)
+
     print(f"[INFO] KST today={today_kst_date()} / fetch_asof(end)={end}")
 
+    # 0) 팩터별 수집 구간 결정
+    jobs: List[FactorJob] = []
     for spec in specs:
         meta = meta_map.get(spec.factor_code, {})
         source = meta.get("source") or spec.source
@@ -784,7 +1103,7 @@ def main():
         frequency = (meta.get("frequency") or spec.frequency).strip().upper()
         ret_type = meta.get("ret_type") or spec.ret_type
         lag_policy = meta.get("lag_policy") or LAG_POLICY_BY_FACTOR.get(spec.factor_code)
-        last_date = supabase_get_last_date(sb, spec.factor_code)
+        last_date = last_date_map.get(spec.factor_code)
 
         # 월간은 기존대로 최신이면 스킵, 일간은 최근 N일 백필
         if last_date is not None and frequency != "D" and last_date >= end:
@@ -800,6 +1119,9 @@ def main():
             else:
                 start_store = last_date + dt.timedelta(days=1)
             start_fetch = apply_lookback(start_store, frequency)
+            if frequency == "D" and (end - last_date).days <= 1:
+                # 증분 실행: 백필 구간 첫 ret 계산용 직전 관측치만 있으면 되므로 lookback 축소
+                start_fetch = start_store - dt.timedelta(days=LOOKBACK_DAYS_DAILY_INCREMENTAL)
         else:
             start_store = default_start
             start_fetch = apply_lookback(default_start, frequency)
@@ -808,99 +1130,143 @@ def main():
             print(f"[SKIP] {spec.factor_code}: no new window (store_from={start_store} > asof={end})")
             continue
 
+        if source == "NASDAQ_DATALINK" and not nasdaq_enabled:
+            print(f"[SKIP] {spec.factor_code}: NASDAQ_DATALINK_API_KEY not set")
+            continue
+
         print(f"[FETCH] {spec.factor_code} ({source} {source_series}) fetch {start_fetch} -> {end} / store from {start_store}")
+        jobs.append(
+            FactorJob(
+                spec=spec,
+                meta=meta,
+                source=source,
+                source_series=source_series,
+                frequency=frequency,
+                ret_type=ret_type,
+                lag_policy=lag_policy,
+                start_store=start_store,
+                start_fetch=start_fetch,
+                last_date=last_date,
+            )
+        )
 
-        used_source_series = source_series
+    # 1) fetch "level" (네트워크 I/O라 스레드 병렬)
+    #    yfinance는 호출이 직렬화되므로 전용 워커 1개로 분리해 HTTP 워커를 점유하지 않게 함
+    #    yfinance 팩터는 1순위 후보 심볼을 먼저 한 번에 받아두고, 빈 심볼만 개별 후보 루프로 폴백
+    yf_jobs = [job for job in jobs if job.source == "YFINANCE"]
+    with ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS) as executor, \
+            ThreadPoolExecutor(max_workers=1) as yf_executor, \
+            ThreadPoolExecutor(max_workers=UPSERT_MAX_WORKERS) as upsert_executor:
+        yf_batch = None
+        if yf_jobs:
+            yf_symbols = sorted({(job.spec.yf_candidates or [job.source_series])[0] for job in yf_jobs})
+            yf_start = min(job.start_fetch for job in yf_jobs)
+            yf_batch = yf_executor.submit(yfinance_download_close_map, yf_symbols, yf_start, end)
+
+        def fetch_yf_job(job: FactorJob) -> Tuple[str, pd.Series]:
+            try:
+                yf_close_map = yf_batch.result()
+            except Exception:
+                yf_close_map = None  # 일괄 조회 실패 시 개별 조회로
+            return fetch_level(job, end, fred_key, ecos_key, nasdaq_key, yf_close_map)
+
+        future_to_job = {
+            (
+                yf_executor.submit(fetch_yf_job, job)
+                if job.source == "YFINANCE"
+                else executor.submit(fetch_level, job, end, fred_key, ecos_key, nasdaq_key)
+            ): job
+            for job in jobs
+        }
 
-        # 1) fetch "level"
-        try:
-            if source == "FRED":
-                level = fred_fetch_series(fred_key, source_series, start_fetch, end)
-
-            elif source == "ECOS":
-                assert spec.ecos_stat_code and spec.ecos_cycle and spec.ecos_item_code
-                level = ecos_fetch_series(
-                    ecos_api_key=ecos_key,
-                    stat_code=spec.ecos_stat_code,
-                    cycle=spec.ecos_cycle,
-                    item_code=spec.ecos_item_code,
-                    start=start_fetch,
-                    end=end,
-                )
+        # 2) fetch가 끝나는 순서대로 compute returns & build rows
+        #    UPSERT_CHUNK_SIZE만큼 쌓이면 바로 업서트를 띄워 남은 fetch와 겹치게 함
+        meta_rows: List[Dict[str, Optional[str]]] = []
+        pending_rows: List[Dict] = []
+        upsert_futures: List[Tuple[Future, int]] = []
+
+        def flush_pending(final: bool = False) -> None:
+            nonlocal pending_rows
+            while pending_rows and (final or len(pending_rows) >= UPSERT_CHUNK_SIZE):
+                chunk = pending_rows[:UPSERT_CHUNK_SIZE]
+                pending_rows = pending_rows[UPSERT_CHUNK_SIZE:]
+                upsert_futures.append((upsert_executor.submit(supabase_upsert_rows, sb, chunk), len(chunk)))
+
+        for future in as_completed(future_to_job):
+            job = future_to_job[future]
+            spec = job.spec
+            try:
+                used_source_series, level = future.result()
+            except Exception as e:
+                print(f"[FAIL] {spec.factor_code}: fetch error: {e}")
+                continue
 
-            elif source == "NASDAQ_DATALINK":
-                if not nasdaq_enabled:
-                    print(f"[SKIP] {spec.factor_code}: NASDAQ_DATALINK_API_KEY not set")
+            try:
+                level = level.dropna()
+                if level.empty or len(level) < 2:
+                    print(f"[INFO] {spec.factor_code}: series empty/too short")
                     continue
-                level = nasdaq_datalink_fetch_series(nasdaq_key, source_series, start_fetch, end)
 
-            elif source == "PYKRX":
-                level = pykrx_fetch_close_series(source_series, start_fetch, end)
+                ret = compute_returns(level, job.ret_type, spec.duration_years)
+                df = pd.DataFrame({"level": level, "ret": ret})
+                df = _sort_index_if_needed(df)
 
-            elif source == "YFINANCE":
-                cands = spec.yf_candidates or [source_series]
-                used_source_series, level = yfinance_fetch_close_series(cands, start_fetch, end)
-
-            else:
-                raise ValueError(f"Unknown source: {source}")
-
-        except Exception as e:
-            print(f"[FAIL] {spec.factor_code}: fetch error: {e}")
-            continue
+                # store_from 필터 (원본 날짜 기준)
+                df = df.loc[pd.Timestamp(job.start_store):]  # 정렬된 DatetimeIndex 이진 탐색 슬라이스
+                if df.empty:
+                    max_date = level.index.max().date() if len(level) else None
+                    print(f"[INFO] {spec.factor_code}: no new rows after store_from (max_date_in_source={max_date}, store_from={job.start_store})")
+                    continue
 
-        # 2) compute returns & build rows
-        try:
-            level = level.dropna()
-            if level.empty or len(level) < 2:
-                print(f"[INFO] {spec.factor_code}: series empty/too short")
-                continue
+                meta_row = build_factor_metadata_row(
+                    spec,
+                    source=job.source,
+                    source_series=used_source_series,
+                    frequency=job.frequency,
+                    ret_type=job.ret_type,
+                    lag_policy=job.lag_policy,
+                    existing=job.meta,
+                )
+                if meta_row:
+                    meta_rows.append(meta_row)
+
+                rows = build_factor_rows(spec.factor_code, df)
+                n_built = len(rows)
+                if job.last_date is not None:
+                    # 증분 실행: 백필 구간 중 DB 값과 동일한 row는 전송 생략
+                    try:
+                        existing = supabase_fetch_existing_rows(sb, spec.factor_code, job.start_store)
+                        rows = [r for r in rows if not _factor_row_unchanged(r, existing)]
+                    except Exception as e:
+                        print(f"[WARN] {spec.factor_code}: existing rows lookup failed, upsert all: {e}")
+
+                pending_rows.extend(rows)
+                flush_pending()
+                print(
+                    f"[OK] {spec.factor_code}: queued {len(rows)} rows "
+                    f"(unchanged_skipped={n_built - len(rows)}, used_series={used_source_series})"
+                )
 
-            ret = compute_returns(level, ret_type, spec.duration_years)
-            df = pd.DataFrame({"level": level, "ret": ret})
-            df = df.sort_index()
+            except Exception as e:
+                print(f"[FAIL] {spec.factor_code}: transform error: {e}")
 
-            # store_from 필터 (원본 날짜 기준)
-            df = df[df.index.date >= start_store]
-            if df.empty:
-                max_date = level.index.date.max() if len(level) else None
-                print(f"[INFO] {spec.factor_code}: no new rows after store_from (max_date_in_source={max_date}, store_from={start_store})")
-                continue
+        flush_pending(final=True)
 
-            rows: List[Dict] = []
+        # 3) factor_returns 업서트 결과 수집
+        total_rows = 0
+        for upsert_future, n_rows in upsert_futures:
             try:
-                supabase_upsert_factor_metadata(
-                    sb,
-                    spec,
-                    source=source,
-                    source_series=used_source_series,
-                    frequency=frequency,
-                    ret_type=ret_type,
-                    lag_policy=lag_policy,
-                    existing=meta,
-                )
+                upsert_future.result()
+                total_rows += n_rows
             except Exception as e:
-                print(f"[WARN] {spec.factor_code}: factor_metadata upsert failed: {e}")
-
-            for ts, rrow in df.iterrows():
-                record_date = ts.date()  # ✅ 원본 index의 date 그대로
-                row = {
-                    "factor_code": spec.factor_code,
-                    "record_date": record_date.isoformat(),      # 기존 컬럼(= 원본 날짜로 사용)
-                    "level": float(rrow["level"]) if pd.notna(rrow["level"]) else None,
-                    "ret": float(rrow["ret"]) if pd.notna(rrow["ret"]) else None,
-
-                    # ✅ 새 컬럼(있다면 같이 저장; 없으면 Supabase가 에러 낼 수 있음)
-                    "observed_date": record_date.isoformat(),
-                    "effective_kr_date": None,
-                }
-                rows.append(row)
-
-            supabase_upsert_rows(sb, rows)
-            total_rows += len(rows)
-            print(f"[OK] {spec.factor_code}: upserted {len(rows)} rows (used_series={used_source_series})")
+                print(f"[FAIL] factor_returns upsert failed ({n_rows} rows): {e}")
 
+    # 4) factor_metadata 빈 컬럼 보충 (한 번에)
+    if meta_rows:
+        try:
+            supabase_upsert_factor_metadata(sb, meta_rows)
         except Exception as e:
-            print(f"[FAIL] {spec.factor_code}: transform/upsert error: {e}")
+            print(f"[WARN] factor_metadata upsert failed ({len(meta_rows)} factor(s)): {e}")
 
     print(f"\n[DONE] total upserted rows: {total_rows}")
 
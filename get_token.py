@@ -1,11 +1,14 @@
 import json
-import requests
 import time
 from datetime import datetime, timedelta, timezone
 import os
 
+# KIS HTTP 세션/JSON 인코딩은 kis_client와 공유 (재시도 정책, orjson 처리를 한 곳에서 관리)
+from kis_client import BASE_URL, _HTTP_SESSION, _response_json, _json_dumps
+
 AUTH_FILE = "kis_auth.json"
-BASE_URL = "https://openapi.koreainvestment.com:9443"
+KST = timezone(timedelta(hours=9))
+TOKEN_MAX_AGE = timedelta(hours=23)
 
 def load_auth_data():
     if not os.path.exists(AUTH_FILE):
@@ -14,8 +17,13 @@ def load_auth_data():
         return json.load(f)
 
 def save_auth_data(data):
-    with open(AUTH_FILE, "w", encoding="utf-8") as f:
+    # 임시 파일에 쓰고 fsync 후 교체 -> 쓰는 중 중단돼도 kis_auth.json이 잘린 채 남지 않음
+    tmp_path = AUTH_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, AUTH_FILE)
 
 def get_new_token(app_key, app_secret):
     url = f"{BASE_URL}/oauth2/tokenP"
@@ -27,8 +35,8 @@ def get_new_token(app_key, app_secret):
     }
     
     try:
-        res = requests.post(url, headers=headers, data=json.dumps(body), timeout=10)
-        res_json = res.json()
+        res = _HTTP_SESSION.post(url, headers=headers, data=_json_dumps(body), timeout=10)
+        res_json = _response_json(res)
         
         if res.status_code == 200 and 'access_token' in res_json:
             return res_json['access_token'], res_json.get('access_token_token_expired')
@@ -50,9 +58,8 @@ def refresh_tokens():
         return
 
     updated = False
-    # KST 설정
-    KST = timezone(timedelta(hours=9))
     now_kst = datetime.now(KST)
+    today_kst = now_kst.date()
 
     # 1. app_key별로 계좌(항목) 그룹화
     # key: app_key, value: list of item dicts
@@ -97,11 +104,11 @@ def refresh_tokens():
                      last_issued = last_issued.astimezone(KST)
 
                 # 날짜가 다르면 갱신 (KST 기준)
-                if last_issued.date() != now_kst.date():
+                if last_issued.date() != today_kst:
                     should_refresh = True
-                    status_msg = f"날짜 변경됨 (발급: {last_issued.date()}, 현재: {now_kst.date()})"
+                    status_msg = f"날짜 변경됨 (발급: {last_issued.date()}, 현재: {today_kst})"
                 # 안전장치: 23시간 경과시에도 갱신 (자정이 안 지났어도 너무 오래되면 갱신)
-                elif now_kst - last_issued > timedelta(hours=23):
+                elif now_kst - last_issued > TOKEN_MAX_AGE:
                     should_refresh = True
                     status_msg = f"23시간 경과 ({issued_at_str})"
                 else:
@@ -52,6 +52,7 @@ CREATE TABLE public.asset_holdings (
     eval_amt bigint default 0,
     earning_rate double precision
 );
+ALTER TABLE public.asset_holdings ADD CONSTRAINT unique_snapshot_stock UNIQUE (snapshot_id, stock_code);
 
 -- 2-4. 수동 입출금 내역
 CREATE TABLE public.manual_cash_flow (
@@ -0,0 +1,459 @@
+"""
+kis_client.py
+
+main.py(GitHub Actions) / main_local.py(로컬, kis_auth.json) 공용 로직
+- 한국투자 API 토큰 발급 / 잔고 조회 (keep-alive 세션 + app_key별 호출 간격)
+- Supabase(asset_snapshot, asset_holdings) 저장
+- app_key 그룹 단위 병렬 실행
+"""
+
+import json
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except Exception:  # 선택 의존성: 없으면 표준 json
+    orjson = None
+
+BASE_URL = "https://openapi.koreainvestment.com:9443"
+HOLDINGS_CHUNK_SIZE = 500  # asset_holdings 업서트/insert 1회당 row 수
+KIS_MAX_QPS = 3  # app_key당 KIS 호출 상한 (기존 페이지 간 0.3초 대기와 같은 수준)
+
+def _build_http_session() -> requests.Session:
+    # KIS API(openapi.koreainvestment.com:9443) 호출 공용 keep-alive 세션
+    # (토큰 발급/잔고 페이지/계좌 간 TCP+TLS 연결 재사용)
+    session = requests.Session()
+    # 게이트웨이 오류(502/503/504)만 GET/POST 모두 재시도. 429/500은 KIS가 본문(msg_cd)으로
+    # 호출 제한을 알리므로 여기서 재시도하지 않고 호출부(_request_json_with_retry)에서 처리
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+_HTTP_SESSION = _build_http_session()
+
+def _response_json(res):
+    # orjson이 있으면 응답 바이트를 바로 디코드 (결과 dict 형태는 동일)
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return res.json()
+
+def _json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj)
+
+class RateLimiter:
+    """app_key별 KIS 호출 간격 보장. 직전 호출 후 이미 간격이 지났으면 대기하지 않음"""
+    def __init__(self, qps):
+        self.min_interval = 1.0 / qps
+        self.last = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.last + self.min_interval - now
+            if wait > 0:
+                time.sleep(wait)
+                now += wait
+            self.last = now
+
+_RATE_LIMITERS = defaultdict(lambda: RateLimiter(KIS_MAX_QPS))
+_RATE_LIMITERS_GUARD = threading.Lock()
+
+def _rate_limiter(app_key):
+    with _RATE_LIMITERS_GUARD:
+        return _RATE_LIMITERS[app_key]
+
+def _is_rate_limit_error(data: dict) -> bool:
+    msg = str(data.get("msg1", ""))
+    code = str(data.get("msg_cd", ""))
+    if code in {"EGW00123", "EGW00133"}:
+        return True
+    return ("초당" in msg) and ("거래" in msg)
+
+def _request_json_with_retry(url, headers, params, max_retries=5, base_sleep=0.7, max_sleep=5.0):
+    """(응답 JSON, 응답 헤더 tr_cont) 반환. 실패 시 (None, "")"""
+    limiter = _rate_limiter(headers.get("appkey"))
+    for attempt in range(max_retries):
+        limiter.acquire()
+        try:
+            res = _HTTP_SESSION.get(url, headers=headers, params=params, timeout=30)
+            data = _response_json(res)
+        except Exception as e:
+            if attempt < max_retries - 1:
+                time.sleep(min(max_sleep, base_sleep * (2 ** attempt)))
+                continue
+            print(f"\n   ❌ API 요청 실패: {e}")
+            return None, ""
+
+        tr_cont = res.headers.get("tr_cont", "")
+        if data.get("rt_cd") == "0":
+            return data, tr_cont
+
+        if _is_rate_limit_error(data) and attempt < max_retries - 1:
+            sleep_sec = min(max_sleep, base_sleep * (2 ** attempt))
+            print(f"\n   [WARN] Rate limit detected. Sleep {sleep_sec:.1f}s and retry...")
+            time.sleep(sleep_sec)
+            continue
+
+        return data, tr_cont
+
+    return None, ""
+
+def get_token_from_api(app_key, app_secret):
+    """API 서버에 요청하여 새 토큰 발급"""
+    url = f"{BASE_URL}/oauth2/tokenP"
+    headers = {"content-type": "application/json"}
+    body = {
+        "grant_type": "client_credentials",
+        "appkey": app_key,
+        "appsecret": app_secret
+    }
+    try:
+        _rate_limiter(app_key).acquire()
+        # 타임아웃 10초 설정
+        res = _HTTP_SESSION.post(url, headers=headers, data=_json_dumps(body), timeout=10)
+        res_json = _response_json(res)
+        if res.status_code == 200:
+            return res_json['access_token']
+        else:
+            print(f"❌ 토큰 발급 실패: {res_json.get('error_description')}")
+            return None
+    except Exception as e:
+        print(f"❌ 요청 중 에러: {e}")
+        return None
+
+# ============================================================================
+# [핵심] 계좌별 API 조회 로직 분리
+# ============================================================================
+
+def fetch_balance_stock(token, app_key, app_secret, acc_no):
+    """일반 주식 계좌 조회 (위탁, 연금저축, ISA 등)"""
+    url = f"{BASE_URL}/uapi/domestic-stock/v1/trading/inquire-balance"
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "authorization": f"Bearer {token}",
+        "appkey": app_key,
+        "appsecret": app_secret,
+        "tr_id": "TTTC8434R", # 주식 잔고 조회
+        "custtype": "P",
+    }
+    
+    all_holdings = []
+    # 종목 행 변환 루프에서 내장 함수 조회를 줄이기 위해 지역 이름으로 바인딩
+    _int, _float = int, float
+    tot_amt = 0
+    stock_amt = 0
+    cash_amt = 0
+    
+    ctx_area_fk100 = ""
+    ctx_area_nk100 = ""
+    
+    page_count = 0
+    MAX_PAGES = 20
+
+    # 페이지마다 바뀌는 건 CTX_AREA_* 뿐 -> 나머지는 한 번만 구성
+    params = {
+        "CANO": acc_no[:8],
+        "ACNT_PRDT_CD": acc_no[-2:],
+        "AFHR_FLPR_YN": "N", "OFL_YN": "", "INQR_DVSN": "02", "UNPR_DVSN": "01",
+        "FUND_STTL_ICLD_YN": "N", "FNCG_AMT_AUTO_RDPT_YN": "N", "PRCS_DVSN": "00",
+        "CTX_AREA_FK100": ctx_area_fk100,
+        "CTX_AREA_NK100": ctx_area_nk100
+    }
+
+    while True:
+        page_count += 1
+        print(f"      ▶ 일반계좌 페이지 {page_count} 조회 중...", end="\r")
+
+        params["CTX_AREA_FK100"] = ctx_area_fk100
+        params["CTX_AREA_NK100"] = ctx_area_nk100
+        data, tr_cont = _request_json_with_retry(url, headers, params)
+        if data is None:
+            return None
+        
+        if data['rt_cd'] != '0':
+            print(f"\n   ❌ 일반계좌 조회 실패: {data.get('msg1')}")
+            return None
+
+        # 첫 페이지에서 총액 정보 수집
+        if tot_amt == 0 and data['output2']:
+            out2 = data['output2'][0]
+            tot_amt = int(out2['tot_evlu_amt'])
+            stock_amt = int(out2['scts_evlu_amt'])
+            try:
+                cash_amt = int(out2['prvs_rcdl_excc_amt'])
+            except:
+                cash_amt = tot_amt - stock_amt
+
+        # 보유 종목 추가
+        if data['output1']:
+            all_holdings.extend([
+                {
+                    "stock_code": item['pdno'],
+                    "stock_name": item['prdt_name'],
+                    "qty": _int(item['hldg_qty']),
+                    "buy_price": _float(item['pchs_avg_pric']),
+                    "cur_price": _float(item['prpr']),
+                    "eval_amt": _int(item['evlu_amt']),
+                    "earning_rate": _float(item['evlu_pfls_rt'])
+                }
+                for item in data['output1']
+            ])
+        else:
+            break
+        
+        # [수정된 페이지네이션] 다음 키값 없으면 즉시 종료
+        ctx_area_nk100 = data.get('ctx_area_nk100', '').strip()
+        ctx_area_fk100 = data.get('ctx_area_fk100', '').strip()
+        
+        # 응답 헤더 tr_cont가 D/E면 마지막 페이지 -> 빈 페이지 확인용 추가 요청 없이 종료
+        if ctx_area_nk100 == "" or tr_cont in ("D", "E"):
+            break
+
+        # 연속 조회는 요청 헤더 tr_cont=N
+        headers["tr_cont"] = "N"
+
+        if page_count >= MAX_PAGES:
+            break
+    
+    print("") 
+    return {
+        "total_asset": tot_amt,
+        "total_stock": stock_amt,
+        "total_cash": cash_amt,
+        "holdings": all_holdings
+    }
+
+def fetch_balance_irp(token, app_key, app_secret, acc_no):
+    """IRP / 퇴직연금 계좌 조회 (-29)"""
+    url = f"{BASE_URL}/uapi/domestic-stock/v1/trading/pension/inquire-balance"
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "authorization": f"Bearer {token}",
+        "appkey": app_key,
+        "appsecret": app_secret,
+        "tr_id": "TTTC2208R", # 퇴직연금 잔고 조회
+    }
+    
+    all_holdings = []
+    # 종목 행 변환 루프에서 내장 함수/메서드 조회를 줄이기 위해 지역 이름으로 바인딩
+    _int, _float = int, float
+    _append = all_holdings.append
+    seen = set()  # [안전장치] 이미 담은 stock_code
+    sum_holdings = 0
+    tot_amt = 0
+    cash_amt = 0
+    
+    ctx_area_fk100 = ""
+    ctx_area_nk100 = ""
+    
+    page_count = 0
+    MAX_PAGES = 20
+
+    # 페이지마다 바뀌는 건 CTX_AREA_* 뿐 -> 나머지는 한 번만 구성
+    params = {
+        "CANO": acc_no[:8],
+        "ACNT_PRDT_CD": acc_no[-2:],
+        "ACCA_DVSN_CD": "00",
+        "INQR_DVSN": "00",
+        "CTX_AREA_FK100": ctx_area_fk100,
+        "CTX_AREA_NK100": ctx_area_nk100
+    }
+
+    while True:
+        page_count += 1
+        print(f"      ▶ IRP계좌 페이지 {page_count} 조회 중...", end="\r")
+
+        params["CTX_AREA_FK100"] = ctx_area_fk100
+        params["CTX_AREA_NK100"] = ctx_area_nk100
+        data, tr_cont = _request_json_with_retry(url, headers, params)
+        if data is None:
+            return None
+        
+        if data['rt_cd'] != '0':
+            print(f"\n   ❌ IRP계좌 조회 실패: {data.get('msg1')}")
+            return None
+
+        # IRP 총액 정보
+        if tot_amt == 0 and data['output2']:
+            out2 = data['output2']
+            tot_amt = int(out2.get('tot_evlu_amt', 0))
+            try:
+                cash_amt = int(out2.get('prvs_rcdl_excc_amt', 0))
+            except:
+                pass
+            
+        # 보유 종목 추가 (동일 stock_code가 여러 페이지에 중복으로 오면 처음 것만 사용)
+        if data['output1']:
+            for item in data['output1']:
+                code = item['pdno']
+                if code in seen:
+                    continue
+                seen.add(code)
+                eval_amt = _int(item['evlu_amt'])
+                sum_holdings += eval_amt
+                _append({
+                    "stock_code": code,
+                    "stock_name": item['prdt_name'],
+                    "qty": _int(item['hldg_qty']),
+                    "buy_price": _float(item['pchs_avg_pric']),
+                    "cur_price": _float(item['prpr']),
+                    "eval_amt": eval_amt,
+                    "earning_rate": _float(item.get('evlu_erng_rt', 0))
+                })
+        else:
+            break
+        
+        # [수정된 페이지네이션] 다음 키값 없으면 즉시 종료 (무한루프 방지 핵심)
+        ctx_area_nk100 = data.get('ctx_area_nk100', '').strip()
+        ctx_area_fk100 = data.get('ctx_area_fk100', '').strip()
+        
+        # 응답 헤더 tr_cont가 D/E면 마지막 페이지 -> 빈 페이지 확인용 추가 요청 없이 종료
+        if ctx_area_nk100 == "" or tr_cont in ("D", "E"):
+            break
+
+        # 연속 조회는 요청 헤더 tr_cont=N
+        headers["tr_cont"] = "N"
+
+        if page_count >= MAX_PAGES:
+            break
+            
+    print("")
+
+    # IRP 현금 = 총자산 - 주식평가합 (역산)
+    if cash_amt == 0:
+        cash_amt = tot_amt - sum_holdings
+    
+    return {
+        "total_asset": tot_amt,
+        "total_stock": sum_holdings,
+        "total_cash": cash_amt,
+        "holdings": all_holdings
+    }
+
+def _chunked(seq, n):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def save_holdings(supabase, snapshot_id, holdings_data):
+    """snapshot의 보유 종목을 (snapshot_id, stock_code) 기준으로 업서트하고, 더 이상 없는 종목만 삭제"""
+    try:
+        if holdings_data:
+            current_codes = [h['stock_code'] for h in holdings_data]
+            for chunk in _chunked(holdings_data, HOLDINGS_CHUNK_SIZE):
+                supabase.table("asset_holdings").upsert(
+                    chunk, on_conflict="snapshot_id,stock_code"
+                ).execute()
+            supabase.table("asset_holdings").delete().eq("snapshot_id", snapshot_id).not_.in_(
+                "stock_code", current_codes
+            ).execute()
+        else:
+            supabase.table("asset_holdings").delete().eq("snapshot_id", snapshot_id).execute()
+    except Exception as e:
+        # unique 제약(migration_asset_holdings.sql) 미적용 시 기존 delete+insert로 폴백
+        print(f"   [WARN] holdings 업서트 실패, delete+insert로 폴백: {e}")
+        supabase.table("asset_holdings").delete().eq("snapshot_id", snapshot_id).execute()
+        for chunk in _chunked(holdings_data, HOLDINGS_CHUNK_SIZE):
+            supabase.table("asset_holdings").insert(chunk).execute()
+
+def process_account(account_info, token, supabase):
+    name = account_info['name']
+    acc_no = account_info['acc_no']
+    app_key = account_info['app_key']
+    app_secret = account_info['app_secret']
+    
+    # 계좌번호 뒷자리가 '29'로 끝나면 IRP로 자동 인식
+    is_irp = acc_no.endswith('29') or "IRP" in name.upper() or "퇴직" in name
+
+    print(f"   📊 [{name}] 잔고 조회 시작... ({'IRP/연금' if is_irp else '일반주식'})")
+
+    if is_irp:
+        result = fetch_balance_irp(token, app_key, app_secret, acc_no)
+    else:
+        result = fetch_balance_stock(token, app_key, app_secret, acc_no)
+        
+    if not result:
+        return
+
+    # ====================================================
+    # DB 저장 로직
+    # ====================================================
+    
+    KST = timezone(timedelta(hours=9))
+    now_kst = datetime.now(KST)
+    today_str = now_kst.strftime("%Y-%m-%d")
+    
+    snapshot_data = {
+        "account_no": acc_no,
+        "account_name": name,
+        "record_date": today_str,
+        "recorded_at": now_kst.isoformat(),
+        "total_asset": result['total_asset'],
+        "total_stock_amt": result['total_stock'],
+        "total_cash": result['total_cash']
+    }
+
+    res_master = supabase.table("asset_snapshot").upsert(
+        snapshot_data, on_conflict="account_no, record_date"
+    ).execute()
+    
+    if not res_master.data:
+        print("   ❌ DB 저장 실패")
+        return
+
+    snapshot_id = res_master.data[0]['id']
+
+    # 상세 내역 저장 (같은 stock_code는 첫 항목만 -> 업서트 한 번에 같은 키가 두 번 오지 않게)
+    holdings_by_code = {}
+    for item in result['holdings']:
+        if item['stock_code']:
+            holdings_by_code.setdefault(item['stock_code'], item)
+    holdings_data = [{**item, "snapshot_id": snapshot_id} for item in holdings_by_code.values()]
+
+    save_holdings(supabase, snapshot_id, holdings_data)
+
+    if holdings_data:
+        print(f"   ✅ 저장 완료 (자산: {result['total_asset']:,}원 / 종목수: {len(holdings_data)}개)")
+    else:
+        print("   ✅ 저장 완료 (보유종목 없음)")
+
+def run_account_groups(accounts, supabase, resolve_token):
+    """
+    app_key별로 묶어서 그룹끼리만 병렬 처리 (같은 app_key의 KIS 호출 제한은 그룹 내 순차 + RateLimiter로 유지)
+    resolve_token(account) -> token 또는 None (None이면 해당 계좌 건너뜀)
+    """
+    account_groups = defaultdict(list)
+    for account in accounts:
+        account_groups[account.get('app_key')].append(account)
+
+    def process_group(group):
+        for account in group:
+            token = resolve_token(account)
+            if not token:
+                continue
+            try:
+                process_account(account, token, supabase)
+            except Exception as e:
+                print(f"❌ 에러 발생: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, len(account_groups))) as executor:
+        futures = [executor.submit(process_group, group) for group in account_groups.values()]
+        for future in futures:
+            future.result()
@@ -0,0 +1,12 @@
+-- Run this in your Supabase SQL Editor.
+-- asset_holdings를 (snapshot_id, stock_code) 기준으로 업서트하기 위한 unique 제약 추가
+
+-- 1) 기존 중복 행 정리 (같은 snapshot_id, stock_code 중 id가 가장 작은 행만 유지)
+DELETE FROM public.asset_holdings a
+USING public.asset_holdings b
+WHERE a.snapshot_id = b.snapshot_id
+  AND a.stock_code = b.stock_code
+  AND a.id > b.id;
+
+-- 2) unique 제약
+ALTER TABLE public.asset_holdings ADD CONSTRAINT unique_snapshot_stock UNIQUE (snapshot_id, stock_code);
@@ -0,0 +1,63 @@
+-- Run this in your Supabase SQL Editor.
+-- factor_returns 관련 스크립트에서 sb.rpc(...)로 호출하는 함수 모음
+
+-- 1) factor_returns 벌크 업서트
+--    payload: [{"factor_code": ..., "record_date": "YYYY-MM-DD", "level": ..., "ret": ...,
+--               "observed_date": "YYYY-MM-DD", "effective_kr_date": null}, ...]
+--    한 번의 set-based INSERT ... ON CONFLICT로 처리하고 반영 행 수를 반환
+CREATE OR REPLACE FUNCTION public.factor_returns_bulk_upsert(payload jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH ins AS (
+    INSERT INTO public.factor_returns (
+      factor_code, record_date, level, ret, observed_date, effective_kr_date
+    )
+    SELECT
+      r.factor_code, r.record_date, r.level, r.ret, r.observed_date, r.effective_kr_date
+    FROM jsonb_to_recordset(payload) AS r(
+      factor_code text,
+      record_date date,
+      level double precision,
+      ret double precision,
+      observed_date date,
+      effective_kr_date date
+    )
+    ON CONFLICT (factor_code, record_date) DO UPDATE
+      SET level = EXCLUDED.level,
+          ret = EXCLUDED.ret,
+          observed_date = EXCLUDED.observed_date,
+          effective_kr_date = EXCLUDED.effective_kr_date
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM ins;
+$$;
+
+-- 2) 팩터별 마지막 record_date 일괄 조회
+--    factor_codes가 NULL이면 전체 팩터
+CREATE OR REPLACE FUNCTION public.factor_last_dates(factor_codes text[] DEFAULT NULL)
+RETURNS TABLE (factor_code text, last_date date)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT r.factor_code, max(r.record_date) AS last_date
+  FROM public.factor_returns r
+  WHERE factor_codes IS NULL OR r.factor_code = ANY(factor_codes)
+  GROUP BY r.factor_code;
+$$;
+
+-- 3) 팩터별 행 수/기간/ret NULL 수 집계 (debug_factor_presence.py)
+CREATE OR REPLACE FUNCTION public.factor_counts()
+RETURNS TABLE (factor_code text, n bigint, min_date date, max_date date, null_rets bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT
+    r.factor_code,
+    count(*) AS n,
+    min(r.record_date) AS min_date,
+    max(r.record_date) AS max_date,
+    count(*) FILTER (WHERE r.ret IS NULL) AS null_rets
+  FROM public.factor_returns r
+  GROUP BY r.factor_code;
+$$;
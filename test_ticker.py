@@ -20,15 +20,20 @@ Optional (override):
   YF_PROBE_INTERVAL=1d
   YF_MIN_ROWS=40
   OUT_CSV=./yf_symbol_report.csv
+  YF_PROBE_WORKERS=8             # yfinance 후보 탐색 동시 실행 수
 
   WRITE_BACK=true|false          # 기본 true
   CLEAR_SYMBOL_ON_FAIL=false     # true면 FAIL일 때 yf_symbol도 None으로 지움
+  FORCE_REPROBE=false            # true면 yf_checked_at TTL 무시하고 전부 재점검
 """
 
+import csv
 import warnings
 import os
 import sys
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Tuple
 
@@ -46,6 +51,10 @@ try:
     from pykrx import stock as krx_stock
 except Exception:  # optional dependency
     krx_stock = None
+try:
+    from yfinance.exceptions import YFRateLimitError
+except Exception:  # 구버전 yfinance
+    YFRateLimitError = None
 
 load_dotenv()
 
@@ -54,13 +63,50 @@ load_dotenv()
 # Config (defaults)
 # ---------------------------
 TABLE = "ticker_category_map"
+TICKER_COLUMNS = [
+    "stock_code", "stock_name", "asset_type", "country", "currency", "tags",
+    "yf_symbol", "yf_status", "yf_n_rows", "yf_first_date", "yf_last_date",
+    "yf_probe_interval", "yf_probe_period", "yf_reason", "yf_checked_at",
+]
+TICKER_PAGE_SIZE = 1000  # PostgREST 기본 max-rows
 
 DEFAULT_PROBE_PERIOD = "3mo"
 DEFAULT_PROBE_INTERVAL = "1d"
 DEFAULT_MIN_ROWS = 20
+DEFAULT_PROBE_WORKERS = 8  # Yahoo 비공식 한도 고려해 8~16 사이 권장
+YF_BATCH_SIZE = 50  # 1순위 후보 일괄 조회 시 yf.download 1회당 심볼 수
+YF_RATE_LIMIT_RETRIES = 5
+YF_RATE_LIMIT_BASE_SLEEP = 0.3
+YF_RATE_LIMIT_MAX_SLEEP = 5.0
+
+# 종목마다 반복 호출되므로 정규식은 모듈 로드 시 한 번만 컴파일
+_RE_PERIOD = re.compile(r"(\d+)\s*(d|day|days|mo|m|mon|month|months|y|yr|year|years)")
+_RE_6DIGITS = re.compile(r"\d{6}")
+_RE_5DIGITS = re.compile(r"\d{5}")
+_RE_ALNUM6 = re.compile(r"[0-9A-Z]{6}")
+_RE_Q6 = re.compile(r"Q(\d{6})")
+_RE_ANY6 = re.compile(r"(\d{6})")
+_RE_UPPER = re.compile(r"[A-Z]")
 
 DEFAULT_WRITE_BACK = True
 DEFAULT_CLEAR_SYMBOL_ON_FAIL = False
+DEFAULT_FORCE_REPROBE = False
+WRITE_BACK_CHUNK_SIZE = 500
+
+ISSUE_STATUSES = {"FAIL": 0, "MANUAL": 1, "THIN": 2}  # 콘솔 [Top issues] 대상 + 정렬 순서
+REPORT_FIELDS = [
+    "stock_code", "stock_name", "asset_type", "country", "currency", "tags",
+    "candidates", "matched_symbol", "status", "n_rows", "first_date", "last_date",
+    "probe_period", "probe_interval", "heuristic", "reason", "manual_hint",
+]
+
+# yf_checked_at 기준 재점검 주기 (상태별). 목록에 없는 상태는 항상 재점검
+TTL_BY_STATUS = {
+    "OK": timedelta(days=7),
+    "THIN": timedelta(days=1),
+    "FAIL": timedelta(days=1),
+    "MANUAL": timedelta(days=1),
+}
 
 
 # ---------------------------
@@ -68,7 +114,7 @@ DEFAULT_CLEAR_SYMBOL_ON_FAIL = False
 # ---------------------------
 def period_to_days(period: str) -> int:
     p = (period or "").strip().lower()
-    m = re.fullmatch(r"(\d+)\s*(d|day|days|mo|m|mon|month|months|y|yr|year|years)", p)
+    m = _RE_PERIOD.fullmatch(p)
     if not m:
         return 90
     n = int(m.group(1))
@@ -87,7 +133,7 @@ def period_to_days(period: str) -> int:
 # ---------------------------
 def to_pykrx_code(stock_code: str) -> Optional[str]:
     code = normalize_code(stock_code)
-    if re.fullmatch(r"Q(\d{6})", code):
+    if _RE_Q6.fullmatch(code):
         return code[1:]
     if is_krx_6digits(code):
         return code
@@ -128,57 +174,222 @@ def sb_client() -> Client:
     return create_client(url, key)
 
 
+def iter_ticker_pages(sb: Client, page_size: int = TICKER_PAGE_SIZE):
+    """
+    ticker_category_map을 range 페이지 단위로 yield (기본 1000행 제한에 잘리지 않도록)
+    """
+    query = sb.table(TABLE).select(",".join(TICKER_COLUMNS)).order("stock_code")
+    frm = 0
+    while True:
+        rows = query.range(frm, frm + page_size - 1).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            break
+        frm += page_size
+
+
 def fetch_all_tickers(sb: Client) -> pd.DataFrame:
     """
     ✅ ticker_category_map 실제 컬럼에 맞춰서만 select
     """
-    res = sb.table(TABLE).select(
-        "stock_code,stock_name,asset_type,country,currency,tags,"
-        "yf_symbol,yf_status,yf_n_rows,yf_first_date,yf_last_date,"
-        "yf_probe_interval,yf_probe_period,yf_reason,yf_checked_at"
-    ).execute()
+    rows: List[Dict] = []
+    for page in iter_ticker_pages(sb):
+        rows.extend(page)
 
-    rows = res.data or []
     if not rows:
-        return pd.DataFrame(columns=[
-            "stock_code","stock_name","asset_type","country","currency","tags",
-            "yf_symbol","yf_status","yf_n_rows","yf_first_date","yf_last_date",
-            "yf_probe_interval","yf_probe_period","yf_reason","yf_checked_at"
-        ])
+        return pd.DataFrame(columns=TICKER_COLUMNS)
     return pd.DataFrame(rows)
 
 
-def write_back_probe_result(sb: Client, stock_code: str, payload: Dict) -> None:
-    sb.table(TABLE).update(payload).eq("stock_code", stock_code).execute()
+def fresh_probe_mask(tickers: pd.DataFrame, period: str, interval: str, now: datetime) -> pd.Series:
+    """
+    직전 점검 결과가 TTL 이내이고 같은 period/interval로 점검한 행이면 True (벡터 연산)
+    """
+    ttl = pd.to_timedelta(tickers["yf_status"].map(TTL_BY_STATUS))
+    # 소수점 초 유무가 행마다 달라 형식 추론 대신 ISO8601로 파싱
+    checked_at = pd.to_datetime(tickers["yf_checked_at"], errors="coerce", utc=True, format="ISO8601")
+    return (
+        tickers["yf_probe_period"].eq(period)
+        & tickers["yf_probe_interval"].eq(interval)
+        & ((pd.Timestamp(now) - checked_at) < ttl)
+    )
+
+
+def report_rows_from_db(df: pd.DataFrame, period: str, interval: str) -> List[Dict]:
+    """
+    TTL 이내 종목은 DB에 저장된 yf_* 결과를 그대로 리포트 행으로 변환
+    """
+    status = df["yf_status"]
+    stock_code = df["stock_code"].astype(str).str.strip()
+    out = pd.DataFrame({
+        "stock_code": stock_code,
+        "stock_name": df["stock_name"],
+        "asset_type": df["asset_type"],
+        "country": df["country"],
+        "currency": df["currency"],
+        "tags": df["tags"],
+        "candidates": df["yf_symbol"],
+        "matched_symbol": df["yf_symbol"].where(status.isin(["OK", "THIN"]), ""),
+        "status": status,
+        "n_rows": pd.to_numeric(df["yf_n_rows"], errors="coerce").fillna(0).astype(int),
+        "first_date": df["yf_first_date"],
+        "last_date": df["yf_last_date"],
+        "probe_period": period,
+        "probe_interval": interval,
+        "heuristic": "cache:ttl",
+        "reason": df["yf_reason"],
+        "manual_hint": [
+            "" if st == "OK" else recommend_manual_mapping_hint(code, name)
+            for st, code, name in zip(status, stock_code, df["stock_name"])
+        ],
+    }, columns=REPORT_FIELDS)
+    return out.to_dict("records")
+
+
+def write_back_probe_results(sb: Client, rows: List[Dict]) -> int:
+    """
+    점검 결과를 WRITE_BACK_CHUNK_SIZE 단위 bulk upsert(on_conflict=stock_code)로 반영.
+    bulk upsert는 빠진 컬럼을 NULL로 채우므로 payload 컬럼 구성이 같은 행끼리만 묶음.
+    """
+    groups: Dict[Tuple[str, ...], List[Dict]] = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+
+    n = 0
+    for group in groups.values():
+        for i in range(0, len(group), WRITE_BACK_CHUNK_SIZE):
+            chunk = group[i:i + WRITE_BACK_CHUNK_SIZE]
+            sb.table(TABLE).upsert(chunk, on_conflict="stock_code").execute()
+            n += len(chunk)
+    return n
 
 
 # ---------------------------
 # yfinance probing
 # ---------------------------
+def _is_yf_rate_limit_error(e: Exception) -> bool:
+    if YFRateLimitError is not None and isinstance(e, YFRateLimitError):
+        return True
+    msg = str(e)
+    return "Too Many Requests" in msg or "Rate limited" in msg
+
+
 def probe_symbol(symbol: str, period: str = "3mo", interval: str = "1d") -> Tuple[bool, int, Optional[str], Optional[str], str]:
     """
     returns:
       ok, n_rows, first_date_iso, last_date_iso, reason
     """
+    for attempt in range(YF_RATE_LIMIT_RETRIES):
+        try:
+            # yf.download는 전역 결과 dict(shared._DFS)를 공유해 스레드 동시 호출에 안전하지 않음
+            # → 종목별 Ticker.history 사용
+            df = yf.Ticker(symbol).history(
+                period=period,
+                interval=interval,
+                auto_adjust=False,
+                actions=False,  # 행 수/기간만 필요 → 배당/분할 컬럼 처리 생략
+                repair=False,
+            )
+            break
+        except Exception as e:
+            # Yahoo 요청 한도 초과(429)면 지수 백오프 후 재시도
+            if _is_yf_rate_limit_error(e) and attempt < YF_RATE_LIMIT_RETRIES - 1:
+                time.sleep(min(YF_RATE_LIMIT_MAX_SLEEP, YF_RATE_LIMIT_BASE_SLEEP * (2 ** attempt)))
+                continue
+            return False, 0, None, None, f"exception:{e}"
+
+    if df is None or df.empty:
+        return False, 0, None, None, "empty"
+
+    # yfinance 결과는 정렬된 DatetimeIndex → 양 끝 값으로 기간 확인 (재변환/전체 스캔 불필요)
+    first_date = df.index[0].date().isoformat()
+    last_date = df.index[-1].date().isoformat()
+    return True, int(df.shape[0]), first_date, last_date, "ok"
+
+
+def probe_symbols_batch(symbols: List[str], period: str, interval: str) -> Dict[str, Tuple[bool, int, Optional[str], Optional[str], str]]:
+    """
+    여러 심볼을 yf.download 한 번으로 점검해 {symbol: (ok, n_rows, first, last, reason)} 반환.
+    비었거나 예외인 심볼은 빠짐 -> 호출 측에서 개별 재시도.
+    """
+    out: Dict[str, Tuple[bool, int, Optional[str], Optional[str], str]] = {}
+    if not symbols:
+        return out
     try:
         df = yf.download(
-            symbol,
+            symbols,
             period=period,
             interval=interval,
             auto_adjust=False,
             progress=False,
-            threads=False,
+            threads=True,
+            group_by="ticker",
         )
-    except Exception as e:
-        return False, 0, None, None, f"exception:{e}"
-
+    except Exception:
+        return out
     if df is None or df.empty:
-        return False, 0, None, None, "empty"
+        return out
 
-    idx = pd.to_datetime(df.index)
-    first_date = idx.min().date().isoformat() if len(idx) else None
-    last_date = idx.max().date().isoformat() if len(idx) else None
-    return True, int(df.shape[0]), first_date, last_date, "ok"
+    multi = isinstance(df.columns, pd.MultiIndex)
+    for sym in symbols:
+        try:
+            sub = df[sym] if multi else df
+        except KeyError:
+            continue
+        # 여러 심볼의 인덱스가 합쳐져 있으므로 해당 심볼 값이 전부 NaN인 행은 제외
+        sub = sub.dropna(how="all")
+        if sub.empty:
+            continue
+        out[sym] = (True, int(sub.shape[0]), sub.index[0].date().isoformat(), sub.index[-1].date().isoformat(), "ok")
+    return out
+
+
+def probe_candidates(candidates: List[str], period: str, interval: str) -> Tuple[str, int, str, str, str]:
+    """
+    후보를 순서대로 시도해 처음 성공한 심볼 반환 (1순위 실패 시에만 다음 후보)
+    returns:
+      matched_symbol, n_rows, first_date_iso, last_date_iso, last_reason
+    """
+    last_reason = ""
+    for sym in candidates:
+        ok, n, fdt, ldt, reason = probe_symbol(sym, period=period, interval=interval)
+        last_reason = reason
+        if ok:
+            return sym, n, fdt or "", ldt or "", reason
+    return "", 0, "", "", last_reason
+
+
+def iter_probe_results(jobs: List[Dict], period: str, interval: str, workers: int):
+    """
+    yfinance 후보 탐색 결과를 (job, (matched, n_rows, first, last, reason)) 형태로 yield.
+    1순위 후보는 YF_BATCH_SIZE개씩 yf.download로 일괄 조회하고,
+    거기서 빠진 종목만 스레드풀에서 후보 순서대로 개별 재시도.
+    """
+    first_syms = list(dict.fromkeys(job["candidates"][0] for job in jobs))
+    batch_results: Dict[str, Tuple[bool, int, Optional[str], Optional[str], str]] = {}
+    for i in range(0, len(first_syms), YF_BATCH_SIZE):
+        batch_results.update(probe_symbols_batch(first_syms[i:i + YF_BATCH_SIZE], period, interval))
+
+    retry_jobs: List[Dict] = []
+    for job in jobs:
+        sym = job["candidates"][0]
+        hit = batch_results.get(sym)
+        if hit:
+            _, n, fdt, ldt, reason = hit
+            yield job, (sym, n, fdt or "", ldt or "", reason)
+        else:
+            retry_jobs.append(job)
+
+    if not retry_jobs:
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(retry_jobs))) as executor:
+        future_to_job = {
+            executor.submit(probe_candidates, job["candidates"], period, interval): job
+            for job in retry_jobs
+        }
+        for future in as_completed(future_to_job):
+            yield future_to_job[future], future.result()
 
 
 # ---------------------------
@@ -189,11 +400,11 @@ def normalize_code(code: str) -> str:
 
 
 def is_krx_6digits(code: str) -> bool:
-    return bool(re.fullmatch(r"\d{6}", code))
+    return bool(_RE_6DIGITS.fullmatch(code))
 
 
 def pad_krx_code(code: str) -> Optional[str]:
-    if re.fullmatch(r"\d{5}", code):
+    if _RE_5DIGITS.fullmatch(code):
         return "0" + code
     return None
 
@@ -202,73 +413,82 @@ def is_alnum6(code: str) -> bool:
     """
     ✅ 6자리 영숫자(예: 0005D0, 0089C0, 0046A0 같은 케이스)
     """
-    return bool(re.fullmatch(r"[0-9A-Z]{6}", code)) and (not is_krx_6digits(code))
+    return bool(_RE_ALNUM6.fullmatch(code)) and (not is_krx_6digits(code))
 
 
-def generate_candidates(stock_code: str) -> Tuple[List[str], str]:
+def generate_candidates_all(stock_codes: pd.Series) -> Tuple[List[List[str]], List[str]]:
     """
-    후보 심볼 생성 규칙:
+    후보 심볼 생성 규칙 (전체 종목에 pandas 문자열 연산으로 한 번에 분류):
       - 이미 .KS/.KQ가 붙어있으면 그대로
       - 6자리 숫자면 XXXXXX.KS / XXXXXX.KQ
       - 5자리 숫자면 0패딩 후 .KS/.KQ
       - Q+6자리(ETN 등)면 접두어 제거한 6자리 + 원본(Q포함) 둘다 시도
       - ✅ 6자리 영숫자면 그대로 {CODE}.KS / {CODE}.KQ 도 시도  (0005D0 같은 케이스)
       - 문자열에서 6자리 숫자 substring 있으면 그것도 .KS/.KQ
+    returns:
+      (stock_codes 순서의 후보 리스트들, heuristic 노트들)
     """
-    code = normalize_code(stock_code)
+    codes = stock_codes.fillna("").astype(str).str.strip().str.upper()
+    m_cash = codes.eq("CASH")
+    m_given = codes.str.endswith(".KS") | codes.str.endswith(".KQ")
+    m6 = codes.str.fullmatch(_RE_6DIGITS.pattern)
+    m5 = codes.str.fullmatch(_RE_5DIGITS.pattern)
+    mq = codes.str.fullmatch(_RE_Q6.pattern)
+    malnum = codes.str.fullmatch(_RE_ALNUM6.pattern) & ~m6
+    core6 = codes.str.extract(_RE_ANY6.pattern, expand=False).where(~m6)
+
+    all_cands: List[List[str]] = []
+    all_notes: List[str] = []
+    for code, cash, given, d6, d5, q6, an6, ext in zip(codes, m_cash, m_given, m6, m5, mq, malnum, core6):
+        if cash:
+            all_cands.append([])
+            all_notes.append("skip:cash")
+            continue
 
-    if code in ("CASH",):
-        return [], "skip:cash"
+        # 이미 심볼 형태면 그대로
+        if given:
+            all_cands.append([code])
+            all_notes.append("given:yf_symbol")
+            continue
 
-    # 이미 심볼 형태면 그대로
-    if code.endswith(".KS") or code.endswith(".KQ"):
-        return [code], "given:yf_symbol"
+        cands: List[str] = []
+        notes: List[str] = []
 
-    cands: List[str] = []
-    notes: List[str] = []
+        # 6자리 숫자
+        if d6:
+            cands += [f"{code}.KS", f"{code}.KQ"]
+            notes.append("rule:6digits->KS/KQ")
 
-    # 6자리 숫자
-    if is_krx_6digits(code):
-        cands += [f"{code}.KS", f"{code}.KQ"]
-        notes.append("rule:6digits->KS/KQ")
-
-    # 5자리 숫자 -> 0패딩
-    padded = pad_krx_code(code)
-    if padded:
-        cands += [f"{padded}.KS", f"{padded}.KQ"]
-        notes.append("rule:5digits->0pad->KS/KQ")
+        # 5자리 숫자 -> 0패딩
+        if d5:
+            cands += [f"0{code}.KS", f"0{code}.KQ"]
+            notes.append("rule:5digits->0pad->KS/KQ")
 
-    # Q + 6digits
-    m = re.fullmatch(r"Q(\d{6})", code)
-    if m:
-        core = m.group(1)
-        cands += [f"{core}.KS", f"{core}.KQ", f"{code}.KS", f"{code}.KQ"]
-        notes.append("rule:Q+6digits->stripQ + original")
+        # Q + 6digits
+        if q6:
+            core = code[1:]
+            cands += [f"{core}.KS", f"{core}.KQ", f"{code}.KS", f"{code}.KQ"]
+            notes.append("rule:Q+6digits->stripQ + original")
 
-    # ✅ 6자리 영숫자(letters 포함)
-    if is_alnum6(code):
-        cands += [f"{code}.KS", f"{code}.KQ"]
-        notes.append("rule:alnum6->KS/KQ")
+        # ✅ 6자리 영숫자(letters 포함)
+        if an6:
+            cands += [f"{code}.KS", f"{code}.KQ"]
+            notes.append("rule:alnum6->KS/KQ")
 
-    # 문자열 안에 6자리 숫자가 섞여 있으면 추출
-    m2 = re.search(r"(\d{6})", code)
-    if m2 and not is_krx_6digits(code):
-        core = m2.group(1)
-        cands += [f"{core}.KS", f"{core}.KQ"]
-        notes.append("rule:extract_6digits->KS/KQ")
+        # 문자열 안에 6자리 숫자가 섞여 있으면 추출
+        if isinstance(ext, str):
+            cands += [f"{ext}.KS", f"{ext}.KQ"]
+            notes.append("rule:extract_6digits->KS/KQ")
 
-    # dedup
-    seen = set()
-    cands2: List[str] = []
-    for s in cands:
-        if s not in seen:
-            seen.add(s)
-            cands2.append(s)
+        # dedup
+        cands = list(dict.fromkeys(cands))
+        if not cands:
+            notes.append("need_manual_mapping")
 
-    if not cands2:
-        notes.append("need_manual_mapping")
+        all_cands.append(cands)
+        all_notes.append(";".join(notes))
 
-    return cands2, ";".join(notes)
+    return all_cands, all_notes
 
 
 def recommend_manual_mapping_hint(stock_code: str, stock_name: str) -> str:
@@ -277,11 +497,11 @@ def recommend_manual_mapping_hint(stock_code: str, stock_name: str) -> str:
 
     if code == "CASH":
         return "현금은 심볼 불필요"
-    if re.fullmatch(r"Q\d{6}", code):
+    if _RE_Q6.fullmatch(code):
         return "KRX ETN/파생코드일 수 있음: 접두어 Q 제거한 6자리로 시도(예: Q530130 -> 530130.KS)"
     if is_alnum6(code):
         return "6자리 영숫자 코드: Yahoo Finance에서 그대로 검색 후 (CODE.KS / CODE.KQ) 확인"
-    if re.search(r"[A-Z]", code) and not code.endswith((".KS", ".KQ")):
+    if _RE_UPPER.search(code) and not code.endswith((".KS", ".KQ")):
         return "코드가 6자리 숫자가 아님: 실제 KRX 6자리 종목코드 확인 후 (XXXXXX.KS or XXXXXX.KQ)로 매핑 필요"
     if name:
         return f"Yahoo Finance에서 '{name}' 또는 KRX 6자리 코드로 검색 후 .KS/.KQ 확정"
@@ -296,6 +516,7 @@ def main():
     interval = os.environ.get("YF_PROBE_INTERVAL", DEFAULT_PROBE_INTERVAL)
     min_rows = int(os.environ.get("YF_MIN_ROWS", str(DEFAULT_MIN_ROWS)))
     pykrx_days = period_to_days(period)
+    probe_workers = max(1, int(os.environ.get("YF_PROBE_WORKERS", str(DEFAULT_PROBE_WORKERS))))
     out_csv = os.environ.get("OUT_CSV") or f"./yf_symbol_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
     write_back = os.environ.get("WRITE_BACK")
@@ -310,35 +531,65 @@ def main():
     else:
         clear_on_fail_flag = clear_on_fail.strip().lower() == "true"
 
+    force_reprobe = os.environ.get("FORCE_REPROBE")
+    if force_reprobe is None:
+        force_reprobe_flag = DEFAULT_FORCE_REPROBE
+    else:
+        force_reprobe_flag = force_reprobe.strip().lower() == "true"
+
     sb = sb_client()
     tickers = fetch_all_tickers(sb)
     if tickers.empty:
         raise RuntimeError("ticker_category_map is empty.")
 
-    report_rows: List[Dict] = []
-    cnt = {"OK": 0, "THIN": 0, "FAIL": 0, "MANUAL": 0, "SKIP": 0}
-
-    for _, row in tickers.iterrows():
-        stock_code = str(row.get("stock_code", "")).strip()
-        stock_name = row.get("stock_name", "") or ""
-        asset_type = row.get("asset_type", "") or ""
-        country = row.get("country", "") or ""
-        currency = row.get("currency", "") or ""
-        tags = row.get("tags", "") or ""
-
-        # ✅ 이미 yf_symbol이 있으면 최우선 시도
-        yf_symbol = (row.get("yf_symbol") or "").strip()
-
-        # CASH 스킵
-        if stock_code.upper() == "CASH":
-            cnt["SKIP"] += 1
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "asset_type": asset_type,
-                "country": country,
-                "currency": currency,
-                "tags": tags,
+    # 행 루프에서 None/NaN 분기 없이 속성으로 바로 읽도록 미리 채움
+    tickers = tickers.fillna("")
+
+    # 후보 심볼 분류는 전체 종목에 대해 한 번에 계산 (행 루프에서는 조회만)
+    cand_lists, cand_notes = generate_candidates_all(tickers["stock_code"])
+    tickers["cand_symbols"] = pd.Series(cand_lists, index=tickers.index, dtype=object)
+    tickers["cand_heuristic"] = cand_notes
+
+    # 리포트는 메모리에 모으지 않고 한 행씩 바로 CSV에 기록 (처리 순서 그대로, 정렬하지 않음)
+    # 콘솔 요약용으로 FAIL/MANUAL/THIN 행만 메모리에 보관
+    issue_rows: List[Dict] = []
+    with open(out_csv, "w", encoding="utf-8-sig", newline="") as report_fp:
+        report_writer = csv.DictWriter(report_fp, fieldnames=REPORT_FIELDS)
+        report_writer.writeheader()
+
+        def write_row(row: Dict) -> None:
+            report_writer.writerow(row)
+            if row["status"] in ISSUE_STATUSES:
+                issue_rows.append(row)
+
+        def write_rows(rows: List[Dict]) -> None:
+            for row in rows:
+                write_row(row)
+
+        cnt = {"OK": 0, "THIN": 0, "FAIL": 0, "MANUAL": 0, "SKIP": 0}
+        n_cached = 0
+        write_back_rows: List[Dict] = []  # 루프 종료 후 일괄 upsert
+        now_utc = datetime.now(timezone.utc)
+        checked_at = now_utc.isoformat()  # 한 번의 점검 실행은 같은 yf_checked_at으로 기록
+        yf_jobs: List[Dict] = []  # yfinance 후보 탐색 대상
+
+        # ✅ CASH / TTL 이내 재사용 종목은 벡터 마스크로 먼저 분리해 한 번에 리포트 기록 (write-back 없음)
+        mask_cash = tickers["stock_code"].astype(str).str.strip().str.upper().eq("CASH")
+        if force_reprobe_flag:
+            mask_fresh = pd.Series(False, index=tickers.index)
+        else:
+            mask_fresh = ~mask_cash & fresh_probe_mask(tickers, period, interval, now_utc)
+
+        cash = tickers[mask_cash]
+        if not cash.empty:
+            cnt["SKIP"] += len(cash)
+            write_rows(pd.DataFrame({
+                "stock_code": cash["stock_code"].astype(str).str.strip(),
+                "stock_name": cash["stock_name"],
+                "asset_type": cash["asset_type"],
+                "country": cash["country"],
+                "currency": cash["currency"],
+                "tags": cash["tags"],
                 "candidates": "",
                 "matched_symbol": "",
                 "status": "SKIP",
@@ -349,218 +600,237 @@ def main():
                 "probe_interval": interval,
                 "heuristic": "skip:cash",
                 "reason": "cash",
-                "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
-            })
-            continue
-
-        # pykrx 먼저 시도 (Q 접두는 제거)
-        pykrx_code = to_pykrx_code(stock_code)
-        if pykrx_code:
-            ok, n, fdt, ldt, reason = probe_pykrx(pykrx_code, days=pykrx_days)
-            if ok:
-                status = "OK" if n >= min_rows else "THIN"
-                cnt[status] += 1
+                "manual_hint": recommend_manual_mapping_hint("CASH", ""),
+            }, columns=REPORT_FIELDS).to_dict("records"))
+
+        fresh = tickers[mask_fresh]
+        if not fresh.empty:
+            for status, n in fresh["yf_status"].value_counts().items():
+                cnt[status] += int(n)
+            n_cached = len(fresh)
+            write_rows(report_rows_from_db(fresh, period, interval))
+
+        for row in tickers[~(mask_cash | mask_fresh)].itertuples(index=False):
+            stock_code = str(row.stock_code).strip()
+            stock_name = row.stock_name
+            asset_type = row.asset_type
+            country = row.country
+            currency = row.currency
+            tags = row.tags
+
+            # ✅ 이미 yf_symbol이 있으면 최우선 시도
+            yf_symbol = str(row.yf_symbol).strip()
+
+            # pykrx 먼저 시도 (Q 접두는 제거)
+            pykrx_code = to_pykrx_code(stock_code)
+            if pykrx_code:
+                ok, n, fdt, ldt, reason = probe_pykrx(pykrx_code, days=pykrx_days)
+                if ok:
+                    status = "OK" if n >= min_rows else "THIN"
+                    cnt[status] += 1
+
+                    write_row({
+                        "stock_code": stock_code,
+                        "stock_name": stock_name,
+                        "asset_type": asset_type,
+                        "country": country,
+                        "currency": currency,
+                        "tags": tags,
+                        "candidates": f"KRX:{pykrx_code}",
+                        "matched_symbol": f"KRX:{pykrx_code}",
+                        "status": status,
+                        "n_rows": n,
+                        "first_date": fdt or "",
+                        "last_date": ldt or "",
+                        "probe_period": period,
+                        "probe_interval": interval,
+                        "heuristic": "pykrx_first",
+                        "reason": reason,
+                        "manual_hint": "" if status == "OK" else "데이터는 있으나 표본 부족 → 기간 확대/다른 소스 고려",
+                    })
+
+                    if write_back_flag:
+                        payload = {
+                            "yf_status": status,
+                            "yf_n_rows": n,
+                            "yf_first_date": fdt or None,
+                            "yf_last_date": ldt or None,
+                            "yf_probe_interval": interval,
+                            "yf_probe_period": period,
+                            "yf_reason": reason,
+                            "yf_checked_at": checked_at,
+                        }
+                        write_back_rows.append({"stock_code": stock_code, **payload})
+                    continue
+
+            if yf_symbol:
+                if yf_symbol.strip().upper().startswith("KRX:"):
+                    yf_symbol = ""
+                candidates = [yf_symbol]
+                heur_note = "prefer:yf_symbol"
+            else:
+                candidates, heur_note = row.cand_symbols, row.cand_heuristic
+
+            if heur_note == "skip:cash":
+                cnt["SKIP"] += 1
+                write_row({
+                    "stock_code": stock_code,
+                    "stock_name": stock_name,
+                    "asset_type": asset_type,
+                    "country": country,
+                    "currency": currency,
+                    "tags": tags,
+                    "candidates": "",
+                    "matched_symbol": "",
+                    "status": "SKIP",
+                    "n_rows": 0,
+                    "first_date": "",
+                    "last_date": "",
+                    "probe_period": period,
+                    "probe_interval": interval,
+                    "heuristic": heur_note,
+                    "reason": "cash",
+                    "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
+                })
+                continue
 
-                report_rows.append({
+            if not candidates:
+                cnt["MANUAL"] += 1
+                write_row({
                     "stock_code": stock_code,
                     "stock_name": stock_name,
                     "asset_type": asset_type,
                     "country": country,
                     "currency": currency,
                     "tags": tags,
-                    "candidates": f"KRX:{pykrx_code}",
-                    "matched_symbol": f"KRX:{pykrx_code}",
-                    "status": status,
-                    "n_rows": n,
-                    "first_date": fdt or "",
-                    "last_date": ldt or "",
+                    "candidates": "",
+                    "matched_symbol": "",
+                    "status": "MANUAL",
+                    "n_rows": 0,
+                    "first_date": "",
+                    "last_date": "",
                     "probe_period": period,
                     "probe_interval": interval,
-                    "heuristic": "pykrx_first",
-                    "reason": reason,
-                    "manual_hint": "" if status == "OK" else "데이터는 있으나 표본 부족 → 기간 확대/다른 소스 고려",
+                    "heuristic": heur_note,
+                    "reason": "no_candidates",
+                    "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
                 })
 
+                # ✅ MANUAL도 DB에 상태 기록(원하면)
                 if write_back_flag:
                     payload = {
-                        "yf_status": status,
-                        "yf_n_rows": n,
-                        "yf_first_date": fdt or None,
-                        "yf_last_date": ldt or None,
+                        "yf_status": "MANUAL",
+                        "yf_n_rows": 0,
+                        "yf_first_date": None,
+                        "yf_last_date": None,
                         "yf_probe_interval": interval,
                         "yf_probe_period": period,
-                        "yf_reason": reason,
-                        "yf_checked_at": datetime.now(timezone.utc).isoformat(),
+                        "yf_reason": "no_candidates",
+                        "yf_checked_at": checked_at,
                     }
-                    write_back_probe_result(sb, stock_code, payload)
-                continue
+                    write_back_rows.append({"stock_code": stock_code, **payload})
 
-        if yf_symbol:
-            if yf_symbol.strip().upper().startswith("KRX:"):
-                yf_symbol = ""
-            candidates = [yf_symbol]
-            heur_note = "prefer:yf_symbol"
-        else:
-            candidates, heur_note = generate_candidates(stock_code)
+                continue
 
-        if heur_note == "skip:cash":
-            cnt["SKIP"] += 1
-            report_rows.append({
+            yf_jobs.append({
                 "stock_code": stock_code,
                 "stock_name": stock_name,
                 "asset_type": asset_type,
                 "country": country,
                 "currency": currency,
                 "tags": tags,
-                "candidates": "",
-                "matched_symbol": "",
-                "status": "SKIP",
-                "n_rows": 0,
-                "first_date": "",
-                "last_date": "",
-                "probe_period": period,
-                "probe_interval": interval,
+                "candidates": candidates,
                 "heuristic": heur_note,
-                "reason": "cash",
-                "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
             })
-            continue
 
-        if not candidates:
-            cnt["MANUAL"] += 1
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "asset_type": asset_type,
-                "country": country,
-                "currency": currency,
-                "tags": tags,
-                "candidates": "",
-                "matched_symbol": "",
-                "status": "MANUAL",
-                "n_rows": 0,
-                "first_date": "",
-                "last_date": "",
-                "probe_period": period,
-                "probe_interval": interval,
-                "heuristic": heur_note,
-                "reason": "no_candidates",
-                "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
-            })
-
-            # ✅ MANUAL도 DB에 상태 기록(원하면)
-            if write_back_flag:
-                payload = {
-                    "yf_status": "MANUAL",
-                    "yf_n_rows": 0,
-                    "yf_first_date": None,
-                    "yf_last_date": None,
-                    "yf_probe_interval": interval,
-                    "yf_probe_period": period,
-                    "yf_reason": "no_candidates",
-                    "yf_checked_at": datetime.now(timezone.utc).isoformat(),
-                }
-                write_back_probe_result(sb, stock_code, payload)
+        # ✅ 1순위 후보 일괄 조회 → 실패 종목만 스레드풀 개별 재시도 (결과 집계/write-back은 메인 스레드)
+        for job, probe_result in iter_probe_results(yf_jobs, period, interval, probe_workers):
+            stock_code = job["stock_code"]
+            stock_name = job["stock_name"]
+            asset_type = job["asset_type"]
+            country = job["country"]
+            currency = job["currency"]
+            tags = job["tags"]
+            candidates = job["candidates"]
+            heur_note = job["heuristic"]
+            matched, n_rows, first_date, last_date, last_reason = probe_result
+
+            if matched:
+                status = "OK" if n_rows >= min_rows else "THIN"
+                cnt[status] += 1
 
-            continue
+                write_row({
+                    "stock_code": stock_code,
+                    "stock_name": stock_name,
+                    "asset_type": asset_type,
+                    "country": country,
+                    "currency": currency,
+                    "tags": tags,
+                    "candidates": "|".join(candidates),
+                    "matched_symbol": matched,
+                    "status": status,
+                    "n_rows": n_rows,
+                    "first_date": first_date,
+                    "last_date": last_date,
+                    "probe_period": period,
+                    "probe_interval": interval,
+                    "heuristic": heur_note,
+                    "reason": "ok",
+                    "manual_hint": "" if status == "OK" else "데이터는 있으나 표본 부족 → 기간 확대/다른 소스 고려",
+                })
 
-        matched = ""
-        n_rows = 0
-        first_date = ""
-        last_date = ""
-        last_reason = ""
-
-        for sym in candidates:
-            ok, n, fdt, ldt, reason = probe_symbol(sym, period=period, interval=interval)
-            last_reason = reason
-            if ok:
-                matched = sym
-                n_rows = n
-                first_date = fdt or ""
-                last_date = ldt or ""
-                break
-
-        if matched:
-            status = "OK" if n_rows >= min_rows else "THIN"
-            cnt[status] += 1
-
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "asset_type": asset_type,
-                "country": country,
-                "currency": currency,
-                "tags": tags,
-                "candidates": "|".join(candidates),
-                "matched_symbol": matched,
-                "status": status,
-                "n_rows": n_rows,
-                "first_date": first_date,
-                "last_date": last_date,
-                "probe_period": period,
-                "probe_interval": interval,
-                "heuristic": heur_note,
-                "reason": "ok",
-                "manual_hint": "" if status == "OK" else "데이터는 있으나 표본 부족 → 기간 확대/다른 소스 고려",
-            })
+                if write_back_flag:
+                    payload = {
+                        "yf_symbol": matched,
+                        "yf_status": status,
+                        "yf_n_rows": n_rows,
+                        "yf_first_date": first_date or None,
+                        "yf_last_date": last_date or None,
+                        "yf_probe_interval": interval,
+                        "yf_probe_period": period,
+                        "yf_reason": "ok",
+                        "yf_checked_at": checked_at,
+                    }
+                    write_back_rows.append({"stock_code": stock_code, **payload})
 
-            if write_back_flag:
-                payload = {
-                    "yf_symbol": matched,
-                    "yf_status": status,
-                    "yf_n_rows": n_rows,
-                    "yf_first_date": first_date or None,
-                    "yf_last_date": last_date or None,
-                    "yf_probe_interval": interval,
-                    "yf_probe_period": period,
-                    "yf_reason": "ok",
-                    "yf_checked_at": datetime.now(timezone.utc).isoformat(),
-                }
-                write_back_probe_result(sb, stock_code, payload)
+            else:
+                cnt["FAIL"] += 1
+                write_row({
+                    "stock_code": stock_code,
+                    "stock_name": stock_name,
+                    "asset_type": asset_type,
+                    "country": country,
+                    "currency": currency,
+                    "tags": tags,
+                    "candidates": "|".join(candidates),
+                    "matched_symbol": "",
+                    "status": "FAIL",
+                    "n_rows": 0,
+                    "first_date": "",
+                    "last_date": "",
+                    "probe_period": period,
+                    "probe_interval": interval,
+                    "heuristic": heur_note,
+                    "reason": last_reason,
+                    "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
+                })
 
-        else:
-            cnt["FAIL"] += 1
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "asset_type": asset_type,
-                "country": country,
-                "currency": currency,
-                "tags": tags,
-                "candidates": "|".join(candidates),
-                "matched_symbol": "",
-                "status": "FAIL",
-                "n_rows": 0,
-                "first_date": "",
-                "last_date": "",
-                "probe_period": period,
-                "probe_interval": interval,
-                "heuristic": heur_note,
-                "reason": last_reason,
-                "manual_hint": recommend_manual_mapping_hint(stock_code, stock_name),
-            })
+                if write_back_flag:
+                    payload = {
+                        "yf_status": "FAIL",
+                        "yf_n_rows": 0,
+                        "yf_first_date": None,
+                        "yf_last_date": None,
+                        "yf_probe_interval": interval,
+                        "yf_probe_period": period,
+                        "yf_reason": last_reason,
+                        "yf_checked_at": checked_at,
+                    }
+                    if clear_on_fail_flag:
+                        payload["yf_symbol"] = None
+                    write_back_rows.append({"stock_code": stock_code, **payload})
 
-            if write_back_flag:
-                payload = {
-                    "yf_status": "FAIL",
-                    "yf_n_rows": 0,
-                    "yf_first_date": None,
-                    "yf_last_date": None,
-                    "yf_probe_interval": interval,
-                    "yf_probe_period": period,
-                    "yf_reason": last_reason,
-                    "yf_checked_at": datetime.now(timezone.utc).isoformat(),
-                }
-                if clear_on_fail_flag:
-                    payload["yf_symbol"] = None
-                write_back_probe_result(sb, stock_code, payload)
-
-    report = pd.DataFrame(report_rows)
-    status_order = {"FAIL": 0, "MANUAL": 1, "THIN": 2, "OK": 3, "SKIP": 4}
-    report["status_order"] = report["status"].map(status_order).fillna(9).astype(int)
-    report = report.sort_values(["status_order", "asset_type", "stock_code"]).drop(columns=["status_order"])
-
-    report.to_csv(out_csv, index=False, encoding="utf-8-sig")
+    n_written = write_back_probe_results(sb, write_back_rows)
 
     print("========================================")
     print("[yfinance symbol probe report]")
@@ -569,11 +839,14 @@ def main():
     print("----------------------------------------")
     for k in ["OK", "THIN", "FAIL", "MANUAL", "SKIP"]:
         print(f"{k:6}: {cnt[k]}")
-    print(f"WRITE_BACK={write_back_flag} (default={DEFAULT_WRITE_BACK})")
+    print(f"WRITE_BACK={write_back_flag} (default={DEFAULT_WRITE_BACK}), written={n_written}")
     print(f"CLEAR_SYMBOL_ON_FAIL={clear_on_fail_flag} (default={DEFAULT_CLEAR_SYMBOL_ON_FAIL})")
+    print(f"FORCE_REPROBE={force_reprobe_flag} (default={DEFAULT_FORCE_REPROBE}), reused_by_ttl={n_cached}")
     print("========================================")
 
-    head = report[report["status"].isin(["FAIL", "MANUAL", "THIN"])].head(30)
+    issues = pd.DataFrame(issue_rows, columns=REPORT_FIELDS)
+    issues["status_order"] = issues["status"].map(ISSUE_STATUSES)
+    head = issues.sort_values(["status_order", "asset_type", "stock_code"]).head(30)
     if not head.empty:
         print("\n[Top issues]")
         print(head[["status", "stock_code", "stock_name", "candidates", "n_rows", "reason", "manual_hint"]].to_string(index=False))
@@ -24,12 +24,13 @@ ticker_factor_beta_loader.py (FULL REPLACE)
   - 팩터별 overlap(티커 수익률과 동시에 존재하는 날짜 수)을 계산해
     MIN_NOBS 이상인 팩터만 회귀에 사용(ok_factors)
 - PostgREST limit(보통 1000) 이슈 방지:
-  - factor_returns는 factor_code별로 개별 pagination해서 모두 가져옴
+  - factor_returns는 대상 factor_code 전체를 in_ 한 쿼리로 pagination해서 모두 가져옴
 
 Env:
   SUPABASE_URL=...
   SUPABASE_KEY=...
   FACTOR_RET_SOURCE=raw|zscore (optional, default=raw)
+  PX_CACHE_DIR=... (optional, default=./px_cache; pyarrow 설치 시 yfinance 가격 parquet 캐시)
 
 실행:
   uv run python ticker_factor_beta_loader.py
@@ -40,8 +41,10 @@ from __future__ import annotations
 import warnings
 import os
 import re
+import threading
 import time
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
@@ -59,6 +62,10 @@ try:
     from pykrx import stock as krx_stock
 except Exception:  # optional dependency
     krx_stock = None
+try:
+    import pyarrow  # noqa: F401  (DataFrame.to_parquet / read_parquet 엔진)
+except Exception:  # optional dependency
+    pyarrow = None
 
 load_dotenv(override=False)
 
@@ -93,6 +100,14 @@ LOOKBACK_WINDOW = "2y"          # yfinance period
 WINDOW_DAYS = 252               # 회귀에 사용할 최대 관측치(대략 1년 영업일)
 MIN_NOBS = 60                   # 최소 관측치
 UPSERT_CHUNK_SIZE = 500
+PRICE_FETCH_MAX_WORKERS = 8     # 종목별 가격 조회 동시 실행 수 (Yahoo 비공식 한도 고려)
+YF_BATCH_SIZE = 20              # 1순위 후보 일괄 다운로드 시 yf.download 1회당 심볼 수
+
+# yfinance 가격 로컬 캐시 (심볼별 parquet, 다음 실행부터는 마지막 날짜 이후 증분만 다운로드)
+PX_CACHE_DIR = os.getenv("PX_CACHE_DIR", "./px_cache")
+PX_CACHE_ENABLED = pyarrow is not None and PRICE_INTERVAL == "1d"
+PX_CACHE_OVERLAP_DAYS = 7       # 증분 시 캐시 마지막 날짜 이전부터 겹쳐 받아 배당/분할 재조정 여부 확인
+PX_CACHE_COLUMNS = ["Adj Close", "Close"]
 
 REPORT_CSV_PATH = "./beta_run_report.csv"
 
@@ -173,10 +188,11 @@ def _ensure_series(x) -> pd.Series:
 
 
 def log_returns_from_price(px: pd.Series) -> pd.Series:
-    px = px.dropna().astype(float)
-    px = px[px > 0]
-    r = (np.log(px) - np.log(px.shift(1))).dropna()
-    return r
+    # ndarray에서 log 한 번 + diff (NaN > 0 은 False라 dropna도 같이 처리)
+    arr = px.to_numpy(dtype=np.float64)
+    keep = arr > 0
+    r = np.diff(np.log(arr[keep]))
+    return pd.Series(r, index=px.index[keep][1:], name=px.name)
 
 
 def lookback_window_to_days(window: str) -> int:
@@ -381,23 +397,134 @@ def generate_candidates(stock_code: str, yf_symbol: str = "") -> Tuple[List[str]
 # -----------------------------
 # Price returns (yfinance)
 # -----------------------------
-def fetch_price_returns_yf(symbol: str, end_date: dt.date) -> Optional[pd.Series]:
+def _download_price_yf(symbol: str, start: Optional[dt.date] = None) -> Optional[pd.DataFrame]:
     """
-    - Adj Close 우선, 없으면 Close
-    - index -> date로 정규화
+    (I/O) yf.download는 전역 결과 dict(shared._DFS)를 공유해 스레드 동시 호출에 안전하지 않음
+    -> 심볼별 Ticker.history 사용
+    - start가 있으면 start 이후만 (캐시 증분), 없으면 LOOKBACK_WINDOW 전체
     """
+    span = {"start": start.isoformat()} if start else {"period": LOOKBACK_WINDOW}
     try:
-        df = yf.download(
-            symbol,
-            period=LOOKBACK_WINDOW,
+        return yf.Ticker(symbol).history(
             interval=PRICE_INTERVAL,
             auto_adjust=False,
-            progress=False,
-            threads=False,
+            actions=False,
+            **span,
         )
     except Exception:
         return None
 
+
+def _px_cache_path(symbol: str) -> str:
+    safe = re.sub(r"[^0-9A-Za-z._-]", "_", symbol)
+    return os.path.join(PX_CACHE_DIR, f"{safe}.parquet")
+
+
+def _normalize_px_frame(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    캐시 저장/병합용: 가격 컬럼만, tz 없는 날짜 index, 정렬/중복 제거
+    (Ticker.history는 거래소 tz index, yf.download는 tz 없는 index)
+    """
+    if df is None or df.empty:
+        return None
+    cols = [c for c in PX_CACHE_COLUMNS if c in df.columns]
+    if not cols:
+        return None
+
+    out = df[cols].apply(pd.to_numeric, errors="coerce")
+    idx = pd.to_datetime(out.index, errors="coerce")
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    out.index = idx.normalize()
+    out = out[out.index.notna()].dropna(how="all")
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    return out if not out.empty else None
+
+
+def load_px_cache(symbol: str) -> Optional[pd.DataFrame]:
+    if not PX_CACHE_ENABLED:
+        return None
+    path = _px_cache_path(symbol)
+    if not os.path.exists(path):
+        return None
+    try:
+        return _normalize_px_frame(pd.read_parquet(path, engine="pyarrow"))
+    except Exception:
+        return None
+
+
+def px_cache_delta_start(cached: pd.DataFrame) -> dt.date:
+    return cached.index[-1].date() - dt.timedelta(days=PX_CACHE_OVERLAP_DAYS)
+
+
+def update_px_cache(
+    symbol: str,
+    cached: Optional[pd.DataFrame],
+    fresh: Optional[pd.DataFrame],
+    end_date: dt.date,
+) -> Optional[pd.DataFrame]:
+    """
+    캐시 + 새로 받은 가격 병합 후 저장, 병합 결과 반환
+    - 겹치는 날짜의 가격이 다르면(배당/분할로 Adj Close 소급 조정) None -> 호출 측에서 전체 재다운로드
+    - 증분이 비면 캐시 그대로 사용
+    - 저장은 end_date 이하(미완성 당일 봉 제외), LOOKBACK_WINDOW(+7일 여유) 이내만
+    """
+    fresh = _normalize_px_frame(fresh)
+    if cached is None or fresh is None:
+        merged = fresh if cached is None else cached
+    else:
+        common = cached.index.intersection(fresh.index)
+        col = "Adj Close" if ("Adj Close" in cached.columns and "Adj Close" in fresh.columns) else "Close"
+        if len(common) and not np.allclose(
+            cached.loc[common, col].to_numpy(dtype=float),
+            fresh.loc[common, col].to_numpy(dtype=float),
+            rtol=1e-6,
+            equal_nan=True,
+        ):
+            return None
+        merged = pd.concat([cached[~cached.index.isin(fresh.index)], fresh]).sort_index()
+    if merged is None:
+        return None
+
+    keep_from = pd.Timestamp(end_date - dt.timedelta(days=lookback_window_to_days(LOOKBACK_WINDOW) + 7))
+    merged = merged[(merged.index >= keep_from) & (merged.index <= pd.Timestamp(end_date))]
+    if merged.empty:
+        return None
+
+    path = _px_cache_path(symbol)
+    tmp = f"{path}.{threading.get_ident()}.tmp"  # 같은 심볼을 여러 스레드가 써도 원자적 교체
+    try:
+        os.makedirs(PX_CACHE_DIR, exist_ok=True)
+        merged.to_parquet(tmp, engine="pyarrow")
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] px cache write failed: {symbol} ({e})")
+    return merged
+
+
+def download_price_yf_cached(symbol: str, end_date: dt.date) -> Optional[pd.DataFrame]:
+    """
+    캐시가 있으면 증분만 받아 병합, 없거나 재조정 감지 시 LOOKBACK_WINDOW 전체 다운로드
+    """
+    cached = load_px_cache(symbol)
+    if cached is not None:
+        merged = update_px_cache(symbol, cached, _download_price_yf(symbol, start=px_cache_delta_start(cached)), end_date)
+        if merged is not None:
+            return merged
+
+    df = _download_price_yf(symbol)
+    if PX_CACHE_ENABLED:
+        merged = update_px_cache(symbol, None, df, end_date)
+        if merged is not None:
+            return merged
+    return df
+
+
+def _price_returns_from_df(df: Optional[pd.DataFrame], end_date: dt.date) -> Optional[pd.Series]:
+    """
+    - Adj Close 우선, 없으면 Close
+    - index -> date로 정규화
+    """
     if df is None or df.empty:
         return None
 
@@ -425,6 +552,78 @@ def fetch_price_returns_yf(symbol: str, end_date: dt.date) -> Optional[pd.Series
     return ret
 
 
+def download_prices_yf_batch(symbols: List[str], start: Optional[dt.date] = None) -> Dict[str, pd.DataFrame]:
+    """
+    여러 심볼을 yf.download 한 번으로 받아 {symbol: 가격 DataFrame} 반환.
+    비었거나 예외인 심볼은 빠짐 -> 호출 측에서 개별 폴백.
+    - start가 있으면 start 이후만 (캐시 증분), 없으면 LOOKBACK_WINDOW 전체
+    """
+    out: Dict[str, pd.DataFrame] = {}
+    if not symbols:
+        return out
+    span = {"start": start.isoformat()} if start else {"period": LOOKBACK_WINDOW}
+    try:
+        df = yf.download(
+            symbols,
+            interval=PRICE_INTERVAL,
+            **span,
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            group_by="ticker",
+        )
+    except Exception:
+        return out
+    if df is None or df.empty:
+        return out
+
+    multi = isinstance(df.columns, pd.MultiIndex)
+    for sym in symbols:
+        try:
+            sub = df[sym] if multi else df
+        except KeyError:
+            continue
+        # 여러 심볼의 날짜가 합쳐져 있으므로 해당 심볼 값이 전부 NaN인 행은 제외
+        sub = sub.dropna(how="all")
+        if not sub.empty:
+            out[sym] = sub
+    return out
+
+
+def download_prices_yf_batch_cached(symbols: List[str], end_date: dt.date) -> Dict[str, pd.DataFrame]:
+    """
+    download_prices_yf_batch의 캐시 버전 (YF_BATCH_SIZE개씩)
+    - 캐시 있는 심볼: 그 중 가장 이른 (마지막 날짜 - PX_CACHE_OVERLAP_DAYS)부터 증분만 일괄 다운로드 후 병합
+    - 캐시 없는 심볼 + 재조정 감지 심볼: LOOKBACK_WINDOW 전체 일괄 다운로드
+    """
+    cached = {sym: load_px_cache(sym) for sym in symbols}
+    warm = [sym for sym in symbols if cached[sym] is not None]
+    cold = [sym for sym in symbols if cached[sym] is None]
+    out: Dict[str, pd.DataFrame] = {}
+
+    if warm:
+        start = min(px_cache_delta_start(cached[sym]) for sym in warm)
+        fresh: Dict[str, pd.DataFrame] = {}
+        for i in range(0, len(warm), YF_BATCH_SIZE):
+            fresh.update(download_prices_yf_batch(warm[i : i + YF_BATCH_SIZE], start=start))
+        for sym in warm:
+            merged = update_px_cache(sym, cached[sym], fresh.get(sym), end_date)
+            if merged is None:
+                cold.append(sym)
+            else:
+                out[sym] = merged
+
+    for i in range(0, len(cold), YF_BATCH_SIZE):
+        for sym, df in download_prices_yf_batch(cold[i : i + YF_BATCH_SIZE]).items():
+            merged = update_px_cache(sym, None, df, end_date) if PX_CACHE_ENABLED else None
+            out[sym] = merged if merged is not None else df
+    return out
+
+
+def fetch_price_returns_yf(symbol: str, end_date: dt.date) -> Optional[pd.Series]:
+    return _price_returns_from_df(download_price_yf_cached(symbol, end_date), end_date)
+
+
 def fetch_price_returns_krx(stock_code: str, end_date: dt.date) -> Optional[pd.Series]:
     if krx_stock is None:
         return None
@@ -466,24 +665,93 @@ def fetch_price_returns_krx(stock_code: str, end_date: dt.date) -> Optional[pd.S
     return ret
 
 
+def fetch_price_returns_yf_candidates(
+    candidates: List[str],
+    end_date: dt.date,
+) -> Tuple[str, Optional[pd.Series]]:
+    """
+    yfinance 후보를 순서대로 개별 시도
+    returns: (used_symbol, 로그수익률 Series 또는 None)
+    """
+    for sym in candidates:
+        ret_t = fetch_price_returns_yf(sym, end_date=end_date)
+        if ret_t is not None and not ret_t.empty:
+            return sym, ret_t
+    return "", None
+
+
+def fetch_all_ticker_returns(
+    jobs: Dict[str, List[str]],
+    end_date: dt.date,
+) -> Dict[str, Tuple[str, Optional[pd.Series]]]:
+    """
+    {stock_code: candidates} 전체의 (used_symbol, 로그수익률) 조회
+    1) KRX(pykrx) 우선 - 스레드풀 병렬
+    2) 나머지는 yfinance 1순위 후보를 YF_BATCH_SIZE개씩 일괄 다운로드 (로컬 parquet 캐시가 있으면 증분만)
+    3) 그래도 빈 종목만 후보 순서대로 개별 재시도 - 스레드풀 병렬
+    """
+    out: Dict[str, Tuple[str, Optional[pd.Series]]] = {}
+    if not jobs:
+        return out
+    workers = min(PRICE_FETCH_MAX_WORKERS, len(jobs))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_code = {
+            executor.submit(fetch_price_returns_krx, code, end_date): code
+            for code in jobs
+        }
+        for future in as_completed(future_to_code):
+            code = future_to_code[future]
+            ret_t = future.result()
+            if ret_t is not None and not ret_t.empty:
+                out[code] = (f"KRX:{to_pykrx_code(code)}", ret_t)
+
+    pending = {code: cands for code, cands in jobs.items() if code not in out}
+    first_syms = dedup_keep_order([cands[0] for cands in pending.values()])
+    frames = download_prices_yf_batch_cached(first_syms, end_date)
+
+    retry: Dict[str, List[str]] = {}
+    for code, cands in pending.items():
+        ret_t = _price_returns_from_df(frames.get(cands[0]), end_date)
+        if ret_t is not None and not ret_t.empty:
+            out[code] = (cands[0], ret_t)
+        else:
+            retry[code] = cands
+
+    if retry:
+        with ThreadPoolExecutor(max_workers=min(PRICE_FETCH_MAX_WORKERS, len(retry))) as executor:
+            future_to_code = {
+                executor.submit(fetch_price_returns_yf_candidates, cands, end_date): code
+                for code, cands in retry.items()
+            }
+            for future in as_completed(future_to_code):
+                out[future_to_code[future]] = future.result()
+    return out
+
+
 # -----------------------------
-# Factor returns (Supabase) - factor별 pagination (핵심)
+# Factor returns (Supabase) - in_ 한 쿼리 pagination (핵심)
 # -----------------------------
-def fetch_factor_returns_one(
+def fetch_factor_returns_all(
     sb: Client,
-    factor_code: str,
+    factor_codes: List[str],
     end_date: dt.date,
     start_date: Optional[dt.date] = None,
-    frequency: Optional[str] = None,
-    lag_policy: Optional[str] = None,
     page_size: int = 1000,
     max_pages: int = 500,
 ) -> pd.DataFrame:
+    """
+    대상 팩터 전체를 in_ 조건 한 쿼리로 pagination (팩터별 개별 쿼리 대비 왕복 수 감소)
+    - (factor_code, record_date) 순 정렬, 중복은 여기서 한 번만 제거 (마지막 값 유지)
+    """
+    if not factor_codes:
+        return pd.DataFrame(columns=["factor_code", "record_date", "ret"])
     q = (
         sb.table(FACTOR_TABLE)
         .select(f"factor_code,record_date,{FACTOR_RET_COLUMN}")
-        .eq("factor_code", factor_code)
+        .in_("factor_code", factor_codes)
         .lte("record_date", end_date.isoformat())
+        .order("factor_code", desc=False)
         .order("record_date", desc=False)
     )
     if start_date is not None:
@@ -492,16 +760,15 @@ def fetch_factor_returns_one(
     rows = sb_select_all(q, page_size=page_size, max_pages=max_pages)
     df = pd.DataFrame(rows)
     if df.empty:
-        return df
+        return pd.DataFrame(columns=["factor_code", "record_date", "ret"])
 
     if FACTOR_RET_COLUMN != "ret" and FACTOR_RET_COLUMN in df.columns:
         df = df.rename(columns={FACTOR_RET_COLUMN: "ret"})
 
     df["record_date"] = pd.to_datetime(df["record_date"], errors="coerce").dt.date
     df["ret"] = pd.to_numeric(df["ret"], errors="coerce")
-    df["frequency"] = frequency
-    df["lag_policy"] = lag_policy
-    df = df.dropna(subset=["factor_code", "record_date", "ret"]).copy()
+    df = df.dropna(subset=["factor_code", "record_date", "ret"])
+    df = df.drop_duplicates(["factor_code", "record_date"], keep="last")
     return df
 
 
@@ -557,21 +824,25 @@ def fetch_factor_returns(
     factor_codes: List[str],
     end_date: dt.date,
     start_date: Optional[dt.date] = None,
-) -> pd.DataFrame:
+) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], Dict[str, Optional[str]]]:
+    """
+    팩터별 (record_date 배열, ret 배열)로 반환 (long DataFrame concat 없이 바로 wide 구성용)
+    - frequency=M은 일간으로 펼침, D/M 외 frequency는 제외
+    returns: ({factor_code: (dates, rets)}, {factor_code: lag_policy})
+    """
     meta = fetch_factor_metadata(sb, factor_codes)
-    frames: List[pd.DataFrame] = []
+    fdf_all = fetch_factor_returns_all(sb, factor_codes, end_date=end_date, start_date=start_date)
+    by_code = {fc: g for fc, g in fdf_all.groupby("factor_code", sort=False)}
+
+    factor_rets: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    lag_policies: Dict[str, Optional[str]] = {}
     for fc in factor_codes:
         meta_fc = meta.get(fc, {})
         frequency = (meta_fc.get("frequency") or "D").strip().upper()
         lag_policy = meta_fc.get("lag_policy")
-        dfi = fetch_factor_returns_one(
-            sb,
-            fc,
-            end_date=end_date,
-            start_date=start_date,
-            frequency=frequency,
-            lag_policy=lag_policy,
-        )
+        dfi = by_code.get(fc)
+        if dfi is None:
+            continue
         if frequency == "M":
             dfi = expand_monthly_to_daily_ret(
                 dfi,
@@ -579,60 +850,262 @@ def fetch_factor_returns(
                 start_date=start_date,
                 lag_policy=lag_policy,
             )
-        else:
-            dfi = dfi[dfi["frequency"] == "D"].copy()
-        if not dfi.empty:
-            frames.append(dfi)
-    if not frames:
-        return pd.DataFrame(columns=["factor_code", "record_date", "ret", "frequency"])
-    return pd.concat(frames, ignore_index=True)
+        elif frequency != "D":
+            continue
+        if dfi.empty:
+            continue
+        factor_rets[fc] = (dfi["record_date"].to_numpy(), dfi["ret"].to_numpy(dtype=np.float64))
+        lag_policies[fc] = lag_policy
+    return factor_rets, lag_policies
 
 
-def apply_factor_lags(fdf: pd.DataFrame) -> pd.DataFrame:
+def apply_factor_lags(
+    factor_rets: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    lag_policies: Dict[str, Optional[str]],
+) -> pd.DataFrame:
     """
-    factor_code별로 lag를 적용해서 aligned_ret 생성
+    팩터별 (dates, rets)에 lag 적용 후 날짜 x factor wide로 한 번에 구성 (pivot 없음)
     - lag=1이면 factor의 t일 값이 ticker의 t+1일에 대응하도록 shift(1)
+    - shift는 해당 factor 자신의 관측일 기준 (다른 factor 날짜가 섞인 union index 기준 아님)
+    - lag=0인 컬럼은 그대로 사용
     """
-    if fdf.empty:
-        return fdf
-
-    out = fdf.copy()
-    out = out.sort_values(["factor_code", "record_date"])
-    out["aligned_ret"] = np.nan
-
-    has_lag_policy = "lag_policy" in out.columns
-    for fc, g in out.groupby("factor_code", sort=False):
-        lag_policy = None
-        if has_lag_policy:
-            non_null = g["lag_policy"].dropna()
-            if not non_null.empty:
-                lag_policy = non_null.iloc[0]
-        lag = parse_lag_policy(lag_policy)
-        s = g["ret"].astype(float)
-        out.loc[g.index, "aligned_ret"] = s.shift(lag).values
-
-    out = out.dropna(subset=["aligned_ret"]).copy()
-    return out
+    if not factor_rets:
+        return pd.DataFrame()
+
+    cols: Dict[str, pd.Series] = {}
+    for fc, (dates, rets) in factor_rets.items():
+        s = pd.Series(rets, index=dates)  # fetch_factor_returns_all에서 이미 날짜 정렬/중복 제거됨
+        lag = parse_lag_policy(lag_policies.get(fc))
+        if lag:
+            s = s.shift(lag)
+        cols[fc] = s
+
+    # union 날짜로 정렬 (없는 날짜는 NaN)
+    fwide = pd.DataFrame(cols).sort_index().astype(float)
+    return fwide.dropna(how="all")
 
 
 # -----------------------------
 # Regression (multi OLS)
 # -----------------------------
-def ols_multi(y: np.ndarray, X: np.ndarray) -> Tuple[np.ndarray, float, float]:
-    n = y.shape[0]
+def ols_multi_batch(Y: np.ndarray, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    같은 X(날짜/팩터 동일)를 공유하는 여러 종목 수익률 Y(n x T)를 한 번에 회귀
+    - 정규방정식 (X1'X1) coef = X1'Y 를 Cholesky로 풂 (k+1 x k+1 소형 행렬 -> SVD 기반 lstsq보다 가벼움)
+    - X1'X1이 양의 정부호가 아니면(공선성/상수 컬럼) lstsq로 폴백
+    - R²는 잔차/중심화한 Y의 제곱합으로 계산 (상수 수익률이면 NaN)
+    returns: beta(k x T), alpha(T), r2(T)
+    """
+    n = Y.shape[0]
     X1 = np.column_stack([np.ones(n), X])
-    coef, *_ = np.linalg.lstsq(X1, y, rcond=None)
-
-    alpha = float(coef[0])
+    XtX = X1.T @ X1
+    XtY = X1.T @ Y
+    try:
+        L = np.linalg.cholesky(XtX)
+        coef = np.linalg.solve(L.T, np.linalg.solve(L, XtY))
+        if not np.all(np.isfinite(coef)):
+            raise np.linalg.LinAlgError("non-finite coef")
+    except np.linalg.LinAlgError:
+        coef, *_ = np.linalg.lstsq(X1, Y, rcond=None)
+
+    alpha = coef[0].astype(float)
     beta = coef[1:].astype(float)
 
-    y_hat = X1 @ coef
-    ss_res = float(np.sum((y - y_hat) ** 2))
-    ss_tot = float(np.sum((y - np.mean(y)) ** 2))
-    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else float("nan")
+    # 제곱합은 잔차/중심화한 Y로 직접 계산 (Y'Y에서 빼는 형태는 상수에 가까운 수익률에서 소거 오차로 R²=1이 됨)
+    R = Y - X1 @ coef
+    Yc = Y - Y.mean(axis=0)
+    ss_res = np.einsum("ij,ij->j", R, R)
+    ss_tot = np.einsum("ij,ij->j", Yc, Yc)
+    # 상수 수익률은 평균 반올림 오차로 ss_tot가 0이 아닌 극소값 -> Y'Y 대비 상대 기준으로 판정
+    yy = np.einsum("ij,ij->j", Y, Y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(ss_tot > np.finfo(float).eps * yy, 1.0 - ss_res / ss_tot, np.nan)
     return beta, alpha, r2
 
 
+def ols_multi(y: np.ndarray, X: np.ndarray) -> Tuple[np.ndarray, float, float]:
+    beta, alpha, r2 = ols_multi_batch(y.reshape(-1, 1), X)
+    return beta[:, 0], float(alpha[0]), float(r2[0])
+
+
+# -----------------------------
+# Per-ticker regression
+# -----------------------------
+def regress_ticker(
+    stock_code: str,
+    stock_name: str,
+    used_symbol: str,
+    ret_t: pd.Series,
+    fctx: Dict,
+) -> Tuple[Dict, List[Dict], Optional[Dict]]:
+    """
+    한 종목의 단일 팩터 회귀 + 멀티 회귀 준비
+    fctx: main에서 한 번 만든 팩터 ndarray/날짜/컬럼 위치
+    returns: (report_row, 단일 회귀 upsert rows, 멀티 회귀 대기 dict 또는 None)
+    """
+    fwide_arr, fwide_dates, fwide_col = fctx["arr"], fctx["dates"], fctx["col"]
+    available_single_factors = fctx["single_factors"]
+    multi_fcs, multi_cols = fctx["multi_fcs"], fctx["multi_cols"]
+    missing_in_db_multi = fctx["missing_in_db_multi"]
+    upsert_rows: List[Dict] = []
+
+    # inner join 대응: ret_t 날짜를 fwide 날짜에서 searchsorted로 찾아 공통 행만 (여기서 전체 dropna() 절대 하지 않음!)
+    t_dates = np.asarray(ret_t.index.tolist(), dtype="datetime64[D]")
+    pos = np.minimum(np.searchsorted(fwide_dates, t_dates), len(fwide_dates) - 1)
+    hit = fwide_dates[pos] == t_dates
+    rows = pos[hit]
+    dates = fwide_dates[rows]
+    y_all = ret_t.to_numpy(dtype=float)[hit]
+    F = fwide_arr[rows]
+    valid_t = ~np.isnan(y_all)
+    # ret_t와 factor가 동시에 존재하는 날짜 (n x K) -> 팩터별 overlap을 한 번에 합산
+    valid = valid_t[:, None] & ~np.isnan(F)
+    overlaps = valid.sum(axis=0)
+
+    # -----------------------------
+    # Single-factor regressions
+    # -----------------------------
+    single_status_parts: List[str] = []
+    single_n_obs_parts: List[str] = []
+    single_ok_factors: List[str] = []
+    single_skipped_factors: List[str] = []
+    single_failed_factors: List[str] = []
+
+    updated_at = now_utc_iso()
+    created_at = updated_at
+
+    for fc in available_single_factors:
+        j = fwide_col[fc]
+        # window 제한 (최근 WINDOW_DAYS)
+        idx = np.flatnonzero(valid[:, j])[-WINDOW_DAYS:]
+
+        n_obs_single = int(idx.size)
+        single_n_obs_parts.append(f"{fc}:{n_obs_single}")
+
+        if n_obs_single < MIN_NOBS:
+            single_skipped_factors.append(fc)
+            single_status_parts.append(f"{fc}:THIN")
+            continue
+
+        y_single = y_all[idx]
+        X_single = F[idx, j : j + 1]
+
+        try:
+            beta_single, alpha_single, r2_single = ols_multi(y_single, X_single)
+        except Exception:
+            single_failed_factors.append(fc)
+            single_status_parts.append(f"{fc}:FAIL")
+            continue
+
+        asof_date_single = dates[idx].max().astype(object)
+
+        upsert_rows.append({
+            "asof_date": asof_date_single.isoformat(),
+            "window_days": int(WINDOW_DAYS),
+            "stock_code": stock_code,
+            "factor_code": fc,
+
+            "beta": float(beta_single[0]) if np.isfinite(beta_single[0]) else None,
+            "r2": float(r2_single) if np.isfinite(r2_single) else None,
+            "n_obs": int(n_obs_single),
+
+            "updated_at": updated_at,
+            "as_of_date": None,          # 혼동 컬럼 비움
+            "yf_symbol": used_symbol,
+            "alpha": float(alpha_single) if np.isfinite(alpha_single) else None,
+            "method": METHOD_SINGLE,
+            "created_at": created_at,
+            "price_interval": PRICE_INTERVAL,
+            "lookback_window": LOOKBACK_WINDOW,
+        })
+
+        single_ok_factors.append(fc)
+        single_status_parts.append(f"{fc}:OK")
+
+    # ✅ 팩터별 overlap(티커 수익률과 동시에 존재하는 날짜 수) >= MIN_NOBS 인 팩터만 마스크로 선별
+    ok_mask = overlaps[multi_cols] >= MIN_NOBS
+    ok_factors: List[str] = multi_fcs[ok_mask].tolist()
+    ok_cols = multi_cols[ok_mask]
+
+    skipped_factors = [fc for fc in MULTI_FACTOR_CODES if fc not in ok_factors]
+
+    multi_status = "SKIP"
+    multi_reason = f"no_factor_overlap(min_nobs={MIN_NOBS}) missing_in_db={missing_in_db_multi}"
+    multi_asof_date = ""
+    multi_n_obs = 0
+    pending_multi: Optional[Dict] = None
+
+    if ok_factors:
+        # 회귀용 데이터: ret_t + ok_factors만 subset dropna
+        # window 제한 (최근 WINDOW_DAYS)
+        idx = np.flatnonzero(valid[:, ok_cols].all(axis=1))[-WINDOW_DAYS:]
+
+        multi_n_obs = int(idx.size)
+        if multi_n_obs < MIN_NOBS:
+            multi_reason = (
+                f"thin(n_obs={multi_n_obs}) "
+                f"ok_factors={len(ok_factors)} skipped_factors={len(skipped_factors)}"
+            )
+        else:
+            # 회귀는 루프 후 (ok_factors, 회귀 날짜)가 같은 종목끼리 묶어서 한 번에 (X가 동일)
+            multi_status = "PENDING"
+
+            # asof_date: 실제 회귀 데이터의 마지막 날짜
+            asof_date = dates[idx].max().astype(object)
+
+            pending_multi = {
+                "key": (tuple(ok_factors), dates[idx].tobytes()),
+                "y": y_all[idx],
+                "X": F[np.ix_(idx, ok_cols)],
+                "stock_code": stock_code,
+                "used_symbol": used_symbol,
+                "ok_factors": ok_factors,
+                "n_obs": multi_n_obs,
+                "asof_date": asof_date,
+                "updated_at": updated_at,
+                "created_at": created_at,
+                "reason": f"ok_factors={len(ok_factors)}, skipped_factors={len(skipped_factors)}",
+            }
+
+    report_row = {
+        "stock_code": stock_code,
+        "stock_name": stock_name,
+        "status": multi_status,
+        "reason": multi_reason,
+        "used_symbol": used_symbol,
+        "asof_date": multi_asof_date,
+        "n_obs": multi_n_obs,
+        "ok_factors": "|".join(ok_factors),
+        "skipped_factors": "|".join(skipped_factors),
+        "single_ok_factors": "|".join(single_ok_factors),
+        "single_skipped_factors": "|".join(single_skipped_factors),
+        "single_failed_factors": "|".join(single_failed_factors),
+        "single_status_map": "|".join(single_status_parts),
+        "single_n_obs_map": "|".join(single_n_obs_parts),
+    }
+    return report_row, upsert_rows, pending_multi
+
+
+def skip_report_row(stock_code: str, stock_name: str, reason: str, used_symbol: str = "") -> Dict:
+    """회귀 전에 건너뛴 종목의 리포트 행"""
+    return {
+        "stock_code": stock_code,
+        "stock_name": stock_name,
+        "status": "SKIP",
+        "reason": reason,
+        "used_symbol": used_symbol,
+        "asof_date": "",
+        "n_obs": 0,
+        "ok_factors": "",
+        "skipped_factors": "",
+        "single_ok_factors": "",
+        "single_skipped_factors": "",
+        "single_failed_factors": "",
+        "single_status_map": "",
+        "single_n_obs_map": "",
+    }
+
+
 # -----------------------------
 # Upsert betas
 # -----------------------------
@@ -668,288 +1141,121 @@ def main():
     # factor는 최근 구간만 필요: 2y + buffer
     start_date = end - dt.timedelta(days=365 * 2 + 120)
 
-    fdf_raw = fetch_factor_returns(sb, factor_codes=factor_codes, end_date=end, start_date=start_date)
-    present = sorted(fdf_raw["factor_code"].unique().tolist()) if not fdf_raw.empty else []
+    factor_rets, lag_policies = fetch_factor_returns(sb, factor_codes=factor_codes, end_date=end, start_date=start_date)
+    present = sorted(factor_rets)
     missing_in_db_single = [c for c in SINGLE_FACTOR_CODES if c not in present]
     missing_in_db_multi = [c for c in MULTI_FACTOR_CODES if c not in present]
     missing_in_db = dedup_keep_order(missing_in_db_single + missing_in_db_multi)
 
-    fdf = apply_factor_lags(fdf_raw)
+    # 날짜 x factor wide (lag 적용된 ret)
+    fwide = apply_factor_lags(factor_rets, lag_policies)
+
+    # ✅ fwide는 루프 내내 고정 -> ndarray(열 우선)/날짜/컬럼 위치를 한 번만 추출 (종목별 DataFrame join 제거)
+    fwide_arr = np.asfortranarray(fwide.to_numpy(dtype=float))
+    fwide_dates = np.asarray(fwide.index.tolist(), dtype="datetime64[D]")
+    fwide_col = {fc: i for i, fc in enumerate(fwide.columns)}
+
+    # 실제 존재하는 factor만 (종목과 무관하므로 루프 밖에서 한 번)
+    available_single_factors = [c for c in SINGLE_FACTOR_CODES if c in fwide_col]
+    multi_fcs = np.array([c for c in MULTI_FACTOR_CODES if c in fwide_col], dtype=object)
+    multi_cols = np.array([fwide_col[c] for c in multi_fcs], dtype=np.intp)
+    fctx = {
+        "arr": fwide_arr,
+        "dates": fwide_dates,
+        "col": fwide_col,
+        "single_factors": available_single_factors,
+        "multi_fcs": multi_fcs,
+        "multi_cols": multi_cols,
+        "missing_in_db_multi": missing_in_db_multi,
+    }
 
-    # 날짜 x factor wide (aligned_ret)
-    if not fdf.empty:
-        fwide = (
-            fdf.pivot_table(index="record_date", columns="factor_code", values="aligned_ret", aggfunc="last")
-            .sort_index()
-        )
-    else:
-        fwide = pd.DataFrame()
+    # ✅ 가격 수익률은 루프 전에 종목별로 병렬 조회 (CASH/후보 없음 종목 제외)
+    price_jobs: Dict[str, List[str]] = {}
+    for r in tickers.itertuples(index=False):
+        stock_code = str(getattr(r, "stock_code", "")).strip()
+        if stock_code.upper() == "CASH":
+            continue
+        candidates, _note = generate_candidates(stock_code, yf_symbol=str(getattr(r, "yf_symbol", "")).strip())
+        if candidates:
+            price_jobs[stock_code] = candidates
+    price_results = fetch_all_ticker_returns(price_jobs, end_date=end)
 
     report_rows: List[Dict] = []
     upsert_rows: List[Dict] = []
+    multi_groups: Dict[Tuple, List[Dict]] = {}  # (ok_factors, 회귀 날짜) -> 멀티 회귀 대기 종목
+    reg_jobs: List[Tuple] = []
 
-    for _, r in tickers.iterrows():
-        stock_code = str(r.get("stock_code", "")).strip()
-        stock_name = str(r.get("stock_name", "")).strip()
-        yf_symbol = str(r.get("yf_symbol", "")).strip()
+    for r in tickers.itertuples(index=False):
+        stock_code = str(getattr(r, "stock_code", "")).strip()
+        stock_name = str(getattr(r, "stock_name", "")).strip()
+        yf_symbol = str(getattr(r, "yf_symbol", "")).strip()
 
         if stock_code.upper() == "CASH":
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "status": "SKIP",
-                "reason": "cash",
-                "used_symbol": "",
-                "asof_date": "",
-                "n_obs": 0,
-                "ok_factors": "",
-                "skipped_factors": "",
-                "single_ok_factors": "",
-                "single_skipped_factors": "",
-                "single_failed_factors": "",
-                "single_status_map": "",
-                "single_n_obs_map": "",
-            })
+            report_rows.append(skip_report_row(stock_code, stock_name, "cash"))
             continue
 
         candidates, note = generate_candidates(stock_code, yf_symbol=yf_symbol)
         if not candidates:
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "status": "SKIP",
-                "reason": f"no_yf_candidates({note})",
-                "used_symbol": "",
-                "asof_date": "",
-                "n_obs": 0,
-                "ok_factors": "",
-                "skipped_factors": "",
-                "single_ok_factors": "",
-                "single_skipped_factors": "",
-                "single_failed_factors": "",
-                "single_status_map": "",
-                "single_n_obs_map": "",
-            })
+            report_rows.append(skip_report_row(stock_code, stock_name, f"no_yf_candidates({note})"))
             continue
 
-        used_symbol = ""
-        ret_t: Optional[pd.Series] = None
-
-        ret_t = fetch_price_returns_krx(stock_code, end_date=end)
-        if ret_t is not None and not ret_t.empty:
-            used_symbol = f"KRX:{to_pykrx_code(stock_code)}"
+        used_symbol, ret_t = price_results.get(stock_code, ("", None))
 
         if ret_t is None or ret_t.empty:
-            for sym in candidates:
-                ret_t = fetch_price_returns_yf(sym, end_date=end)
-                if ret_t is not None and not ret_t.empty:
-                    used_symbol = sym
-                    break
-
-        if ret_t is None or ret_t.empty:
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "status": "SKIP",
-                "reason": "price_empty",
-                "used_symbol": candidates[0] if candidates else "",
-                "asof_date": "",
-                "n_obs": 0,
-                "ok_factors": "",
-                "skipped_factors": "",
-                "single_ok_factors": "",
-                "single_skipped_factors": "",
-                "single_failed_factors": "",
-                "single_status_map": "",
-                "single_n_obs_map": "",
-            })
+            report_rows.append(skip_report_row(stock_code, stock_name, "price_empty", candidates[0]))
             continue
 
         if fwide.empty:
-            report_rows.append({
-                "stock_code": stock_code,
-                "stock_name": stock_name,
-                "status": "SKIP",
-                "reason": "no_factors_in_db",
-                "used_symbol": used_symbol,
-                "asof_date": "",
-                "n_obs": 0,
-                "ok_factors": "",
-                "skipped_factors": "",
-                "single_ok_factors": "",
-                "single_skipped_factors": "",
-                "single_failed_factors": "",
-                "single_status_map": "",
-                "single_n_obs_map": "",
-            })
+            report_rows.append(skip_report_row(stock_code, stock_name, "no_factors_in_db", used_symbol))
             continue
 
-        # join (여기서 전체 dropna() 절대 하지 않음!)
-        df = pd.DataFrame({"ret_t": ret_t})
-        df.index.name = "record_date"
-        df = df.join(fwide, how="inner")
-
-        # 실제 존재하는 factor만
-        available_single_factors = [c for c in SINGLE_FACTOR_CODES if c in df.columns]
-        available_multi_factors = [c for c in MULTI_FACTOR_CODES if c in df.columns]
-
-        # -----------------------------
-        # Single-factor regressions
-        # -----------------------------
-        single_status_parts: List[str] = []
-        single_n_obs_parts: List[str] = []
-        single_ok_factors: List[str] = []
-        single_skipped_factors: List[str] = []
-        single_failed_factors: List[str] = []
-
-        updated_at = now_utc_iso()
-        created_at = updated_at
-
-        for fc in available_single_factors:
-            df_single = df[["ret_t", fc]].dropna()
-
-            if len(df_single) > WINDOW_DAYS:
-                df_single = df_single.iloc[-WINDOW_DAYS:].copy()
-
-            n_obs_single = int(df_single.shape[0])
-            single_n_obs_parts.append(f"{fc}:{n_obs_single}")
-
-            if n_obs_single < MIN_NOBS:
-                single_skipped_factors.append(fc)
-                single_status_parts.append(f"{fc}:THIN")
-                continue
-
-            y_single = df_single["ret_t"].astype(float).values
-            X_single = df_single[[fc]].astype(float).values
-
-            try:
-                beta_single, alpha_single, r2_single = ols_multi(y_single, X_single)
-            except Exception:
-                single_failed_factors.append(fc)
-                single_status_parts.append(f"{fc}:FAIL")
-                continue
-
-            asof_date_single = df_single.index.max()
-            if isinstance(asof_date_single, (pd.Timestamp, dt.datetime)):
-                asof_date_single = asof_date_single.date()
-            if not isinstance(asof_date_single, dt.date):
-                asof_date_single = end
-
-            upsert_rows.append({
-                "asof_date": asof_date_single.isoformat(),
-                "window_days": int(WINDOW_DAYS),
-                "stock_code": stock_code,
-                "factor_code": fc,
-
-                "beta": float(beta_single[0]) if np.isfinite(beta_single[0]) else None,
-                "r2": float(r2_single) if np.isfinite(r2_single) else None,
-                "n_obs": int(n_obs_single),
+        # 회귀는 루프 후 일괄, 리포트 순서 유지를 위해 자리만 잡아 둠
+        reg_jobs.append((len(report_rows), stock_code, stock_name, used_symbol, ret_t))
+        report_rows.append({})
+
+    for pos, stock_code, stock_name, used_symbol, ret_t in reg_jobs:
+        report_row, rows, pending_multi = regress_ticker(stock_code, stock_name, used_symbol, ret_t, fctx)
+        report_rows[pos] = report_row
+        upsert_rows.extend(rows)
+        if pending_multi is not None:
+            pending_multi["report_row"] = report_row
+            multi_groups.setdefault(pending_multi["key"], []).append(pending_multi)
+
+    # ✅ 멀티 회귀: 같은 X를 공유하는 종목들의 수익률을 Y(n x T)로 쌓아 그룹당 한 번에 풂
+    for jobs in multi_groups.values():
+        Y = np.column_stack([job["y"] for job in jobs])
+        try:
+            beta, alpha, r2 = ols_multi_batch(Y, jobs[0]["X"])
+        except Exception as e:
+            for job in jobs:
+                job["report_row"].update(status="FAIL", reason=f"ols_exception:{e}")
+            continue
 
-                "updated_at": updated_at,
-                "as_of_date": None,          # 혼동 컬럼 비움
-                "yf_symbol": used_symbol,
-                "alpha": float(alpha_single) if np.isfinite(alpha_single) else None,
-                "method": METHOD_SINGLE,
-                "created_at": created_at,
-                "price_interval": PRICE_INTERVAL,
-                "lookback_window": LOOKBACK_WINDOW,
-            })
-
-            single_ok_factors.append(fc)
-            single_status_parts.append(f"{fc}:OK")
-
-        # ✅ 팩터별 overlap(티커 수익률과 동시에 존재하는 날짜 수) 계산
-        ok_factors: List[str] = []
-        overlap_map: Dict[str, int] = {}
-        for fc in available_multi_factors:
-            tmp = df[["ret_t", fc]].dropna()
-            overlap = int(tmp.shape[0])
-            overlap_map[fc] = overlap
-            if overlap >= MIN_NOBS:
-                ok_factors.append(fc)
-
-        skipped_factors = [fc for fc in MULTI_FACTOR_CODES if fc not in ok_factors]
-
-        multi_status = "SKIP"
-        multi_reason = f"no_factor_overlap(min_nobs={MIN_NOBS}) missing_in_db={missing_in_db_multi}"
-        multi_asof_date = ""
-        multi_n_obs = 0
-
-        if ok_factors:
-            # 회귀용 데이터: ret_t + ok_factors만 subset dropna
-            need_cols = ["ret_t"] + ok_factors
-            df2 = df[need_cols].dropna().copy()
-
-            # window 제한 (최근 WINDOW_DAYS)
-            if len(df2) > WINDOW_DAYS:
-                df2 = df2.iloc[-WINDOW_DAYS:].copy()
-
-            multi_n_obs = int(df2.shape[0])
-            if multi_n_obs < MIN_NOBS:
-                multi_reason = (
-                    f"thin(n_obs={multi_n_obs}) "
-                    f"ok_factors={len(ok_factors)} skipped_factors={len(skipped_factors)}"
-                )
-            else:
-                # 회귀
-                y = df2["ret_t"].astype(float).values
-                X = df2[ok_factors].astype(float).values
-
-                try:
-                    beta, alpha, r2 = ols_multi(y, X)
-                except Exception as e:
-                    multi_status = "FAIL"
-                    multi_reason = f"ols_exception:{e}"
-                else:
-                    multi_status = "OK"
-                    multi_reason = f"ok_factors={len(ok_factors)}, skipped_factors={len(skipped_factors)}"
-
-                    # asof_date: 실제 회귀 데이터의 마지막 날짜
-                    asof_date = df2.index.max()
-                    if isinstance(asof_date, (pd.Timestamp, dt.datetime)):
-                        asof_date = asof_date.date()
-                    if not isinstance(asof_date, dt.date):
-                        asof_date = end
-
-                    multi_asof_date = asof_date.isoformat()
-
-                    for i, fc in enumerate(ok_factors):
-                        upsert_rows.append({
-                            "asof_date": asof_date.isoformat(),
-                            "window_days": int(WINDOW_DAYS),
-                            "stock_code": stock_code,
-                            "factor_code": fc,
-
-                            "beta": float(beta[i]) if np.isfinite(beta[i]) else None,
-                            "r2": float(r2) if np.isfinite(r2) else None,
-                            "n_obs": int(multi_n_obs),
-
-                            "updated_at": updated_at,
-                            "as_of_date": None,          # 혼동 컬럼 비움
-                            "yf_symbol": used_symbol,
-                            "alpha": float(alpha) if np.isfinite(alpha) else None,
-                            "method": METHOD_MULTI,
-                            "created_at": created_at,
-                            "price_interval": PRICE_INTERVAL,
-                            "lookback_window": LOOKBACK_WINDOW,
-                        })
-
-        report_rows.append({
-            "stock_code": stock_code,
-            "stock_name": stock_name,
-            "status": multi_status,
-            "reason": multi_reason,
-            "used_symbol": used_symbol,
-            "asof_date": multi_asof_date,
-            "n_obs": multi_n_obs,
-            "ok_factors": "|".join(ok_factors),
-            "skipped_factors": "|".join(skipped_factors),
-            "single_ok_factors": "|".join(single_ok_factors),
-            "single_skipped_factors": "|".join(single_skipped_factors),
-            "single_failed_factors": "|".join(single_failed_factors),
-            "single_status_map": "|".join(single_status_parts),
-            "single_n_obs_map": "|".join(single_n_obs_parts),
-        })
+        for j, job in enumerate(jobs):
+            alpha_j = float(alpha[j])
+            r2_j = float(r2[j])
+            asof_iso = job["asof_date"].isoformat()
+            for i, fc in enumerate(job["ok_factors"]):
+                upsert_rows.append({
+                    "asof_date": asof_iso,
+                    "window_days": int(WINDOW_DAYS),
+                    "stock_code": job["stock_code"],
+                    "factor_code": fc,
+
+                    "beta": float(beta[i, j]) if np.isfinite(beta[i, j]) else None,
+                    "r2": r2_j if np.isfinite(r2_j) else None,
+                    "n_obs": int(job["n_obs"]),
+
+                    "updated_at": job["updated_at"],
+                    "as_of_date": None,          # 혼동 컬럼 비움
+                    "yf_symbol": job["used_symbol"],
+                    "alpha": alpha_j if np.isfinite(alpha_j) else None,
+                    "method": METHOD_MULTI,
+                    "created_at": job["created_at"],
+                    "price_interval": PRICE_INTERVAL,
+                    "lookback_window": LOOKBACK_WINDOW,
+                })
+            job["report_row"].update(status="OK", reason=job["reason"], asof_date=asof_iso)
 
     # DB upsert
     try: